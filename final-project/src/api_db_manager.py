@@ -3,7 +3,261 @@
 
 import requests
 import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, List
+from database.roster_cache import RosterCache
+from config.constants import (
+    BULK_IMPORT_CHUNK_SIZE, API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_POOL_SIZE,
+    API_RETRIES, API_RETRY_BACKOFF, API_LATENCY_BUCKETS_MS, API_CACHE_TTL, API_CACHE_MAX_ENTRIES
+)
+
+# Methods that are safe to send again when a request fails midway
+IDEMPOTENT_METHODS = ('GET', 'DELETE')
+# Gateway errors worth retrying; other statuses are returned as-is
+RETRY_STATUSES = (502, 503, 504)
+# GET prefixes whose cached responses a successful write to each API resource
+# makes stale; writes to resources not listed here expire the whole cache
+WRITE_INVALIDATES = {
+    'events': ('/api/events', '/api/attendance', '/api/recent-scans', '/api/check-timeslot'),
+    'users': ('/api/users',),
+    'students': ('/api/students', '/api/attendance', '/api/recent-scans'),
+    'scan': ('/api/attendance', '/api/recent-scans', '/api/check-timeslot'),
+    'record-scan': ('/api/attendance', '/api/recent-scans', '/api/check-timeslot'),
+    'record-timeslot': ('/api/attendance', '/api/recent-scans', '/api/check-timeslot'),
+    'login': ('/api/recent-logins',),
+    'logout': ('/api/recent-logins',),
+}
+
+
+class LatencyHistogram:
+    """Request count and latency distribution for one API endpoint."""
+    
+    def __init__(self, buckets=API_LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last bucket is everything slower
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def add(self, ms: float, ok: bool = True):
+        """Record one request that took ``ms`` milliseconds."""
+        index = next((i for i, bound in enumerate(self.buckets) if ms <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if not ok:
+            self.errors += 1
+    
+    def percentile(self, fraction: float) -> float:
+        """Upper bound (ms) of the bucket holding the given fraction of requests."""
+        count = sum(self.counts)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if count and seen >= fraction * count:
+                return self.buckets[index] if index < len(self.buckets) else self.max_ms
+        return 0.0
+    
+    def to_dict(self) -> Dict:
+        count = sum(self.counts)
+        labels = [f"<={bound}ms" for bound in self.buckets] + [f">{self.buckets[-1]}ms"]
+        return {
+            'count': count,
+            'errors': self.errors,
+            'mean_ms': self.total_ms / count if count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class ResponseCache:
+    """GET response bodies with their ETags, for read-through caching.
+    
+    An entry younger than the caller's TTL is served without a request;
+    an older one is revalidated with If-None-Match, so an unchanged
+    resource costs a 304 instead of the full payload. Bodies are kept as
+    text and parsed per read, so callers can't modify the cached copy.
+    
+    Writes invalidate by endpoint prefix. A GET that was already in flight
+    when a write landed may carry the old data, so its response is not
+    cached as fresh (see the ``generation`` returned by lookup()).
+    """
+    
+    def __init__(self, max_entries: int = API_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # endpoint -> [etag, body, fetched_at]
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._invalidated = {}  # prefix -> generation of its latest invalidation
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+    
+    def lookup(self, endpoint: str, ttl: float):
+        """Find a cached response.
+        
+        Returns:
+            Tuple of (body, etag, generation): body is set only while the
+            entry is within ``ttl``; etag is set whenever an entry exists, for
+            revalidation; generation is passed back to not_modified()/store()
+        """
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is None:
+                return None, None, self._generation
+            self._entries.move_to_end(endpoint)
+            if time.monotonic() - entry[2] < ttl:
+                self.hits += 1
+                return entry[1], entry[0], self._generation
+            return None, entry[0], self._generation
+    
+    def not_modified(self, endpoint: str, generation: int) -> Optional[str]:
+        """Mark an entry fresh after a 304 and return its body."""
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is None:
+                return None
+            if not self._invalidated_since(endpoint, generation):
+                entry[2] = time.monotonic()
+            self.revalidated += 1
+            return entry[1]
+    
+    def store(self, endpoint: str, etag: Optional[str], body: str, generation: int):
+        """Keep a 200 response, evicting the least recently used entry when full.
+        
+        A response to a GET sent before a write to its resource is not kept.
+        """
+        with self._lock:
+            self.misses += 1
+            if self._invalidated_since(endpoint, generation):
+                return
+            self._entries[endpoint] = [etag, body, time.monotonic()]
+            self._entries.move_to_end(endpoint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, prefixes):
+        """Make entries under any of ``prefixes`` stale.
+        
+        ETags are kept, so the next read is a cheap revalidation.
+        """
+        with self._lock:
+            self._generation += 1
+            for prefix in prefixes:
+                self._invalidated[prefix] = self._generation
+            for endpoint, entry in self._entries.items():
+                if endpoint.startswith(prefixes):
+                    entry[2] = 0.0
+    
+    def _invalidated_since(self, endpoint: str, generation: int) -> bool:
+        return any(endpoint.startswith(prefix) and seen > generation
+                   for prefix, seen in self._invalidated.items())
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses
+            }
+
+
+def endpoint_key(method: str, endpoint: str) -> str:
+    """Group requests by route: '/api/students/S1?x=1' -> 'GET /api/students/*'."""
+    parts = endpoint.split('?')[0].strip('/').split('/')
+    return f"{method.upper()} /{'/'.join(parts[:2])}{'/*' if len(parts) > 2 else ''}"
+
+
+def invalidated_prefixes(endpoint: str) -> tuple:
+    """Cached GET prefixes a write to ``endpoint`` makes stale: '/api/scan' -> attendance reads."""
+    resource = endpoint.split('?')[0].strip('/').split('/')[1:2]
+    return WRITE_INVALIDATES.get(resource[0] if resource else '', ('/',))
+
+
+def retry_delay(attempt: int) -> float:
+    """Jittered exponential backoff before retry number ``attempt`` (0-based)."""
+    return API_RETRY_BACKOFF * (2 ** attempt) * (1 + random.random())
+
+
+class RequestAttempts:
+    """Retry policy, latency recording and cache invalidation for one API request.
+    
+    Shared by APIDatabase._send and the async facade, which differ only in
+    the HTTP client call and in how they wait between attempts::
+    
+        attempts = RequestAttempts(db, method, endpoint)
+        while True:
+            attempts.start()
+            try:
+                response = <send the request>
+            except <connection error or timeout> as e:
+                delay = attempts.failed(e)
+            else:
+                delay = attempts.completed(response.status_code)
+                if delay is None:
+                    return response
+            <wait delay seconds>
+    """
+    
+    def __init__(self, db: 'APIDatabase', method: str, endpoint: str):
+        self.db = db
+        self.method = method.upper()
+        self.endpoint = endpoint
+        self.retries = API_RETRIES if self.method in IDEMPOTENT_METHODS else 0
+        self.attempt = 0
+        self._started = 0.0
+    
+    def start(self):
+        """Mark the start of an attempt."""
+        self._started = time.perf_counter()
+    
+    def failed(self, error: Exception) -> float:
+        """Record an attempt that could not connect or timed out.
+        
+        Returns:
+            Seconds to wait before the next attempt
+        
+        Raises:
+            The given error, when no retries are left
+        """
+        self._finish(ok=False)
+        if self.attempt == self.retries:
+            raise error
+        print(f"API request failed ({error}), retrying ({self.attempt + 1}/{self.retries})")
+        return self._next_delay()
+    
+    def completed(self, status_code: int) -> Optional[float]:
+        """Record an attempt that got a response.
+        
+        Returns:
+            Seconds to wait before retrying a gateway error, or None to
+            return the response
+        """
+        self._finish(ok=status_code < 500)
+        if status_code not in RETRY_STATUSES or self.attempt == self.retries:
+            return None
+        print(f"API error: {status_code}, retrying ({self.attempt + 1}/{self.retries})")
+        return self._next_delay()
+    
+    def _finish(self, ok: bool):
+        self.db.record_latency(self.method, self.endpoint, time.perf_counter() - self._started, ok=ok)
+        if self.method != 'GET':
+            # Once a write was answered (or timed out, and so may have been
+            # applied), reads of the resource it touched are stale
+            self.db.response_cache.invalidate(invalidated_prefixes(self.endpoint))
+    
+    def _next_delay(self) -> float:
+        delay = retry_delay(self.attempt)
+        self.attempt += 1
+        return delay
+
 
 class APIDatabase:
     """Database manager that uses REST API for remote database access."""
@@ -15,36 +269,141 @@ class APIDatabase:
             'Content-Type': 'application/json',
             'X-API-Key': api_key
         }
+        self.roster_cache = RosterCache()
+        
+        # One keep-alive session so calls reuse connections instead of reconnecting
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=API_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+        self.timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+        
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._latency_lock = threading.Lock()
+        self.response_cache = ResponseCache()
     
-    def _make_request(self, method: str, endpoint: str, data=None):
-        """Make HTTP request to API."""
+    def _send(self, method: str, endpoint: str, data=None, headers: Optional[Dict] = None) -> requests.Response:
+        """Send a request on the pooled session.
+        
+        Idempotent requests that fail to connect, time out or hit a gateway
+        error are retried with jittered backoff; others are sent once. Once
+        a write gets its response, the cached reads of the resource it
+        touched are made stale so the change is seen at once (see
+        RequestAttempts).
+        
+        Raises:
+            requests.exceptions.RequestException: If the last attempt fails
+        """
         url = f"{self.api_base_url}{endpoint}"
+        attempts = RequestAttempts(self, method, endpoint)
+        while True:
+            attempts.start()
+            try:
+                response = self.session.request(attempts.method, url, json=data, headers=headers,
+                                                timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = attempts.failed(e)
+            else:
+                delay = attempts.completed(response.status_code)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+    
+    def record_latency(self, method: str, endpoint: str, seconds: float, ok: bool = True):
+        """Add one request to its endpoint's latency histogram."""
+        key = endpoint_key(method, endpoint)
+        with self._latency_lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = LatencyHistogram()
+            histogram.add(seconds * 1000, ok)
+    
+    def get_request_stats(self) -> Dict:
+        """Get per-endpoint request counts and latency histograms."""
+        with self._latency_lock:
+            return {key: histogram.to_dict() for key, histogram in sorted(self._latency.items())}
+    
+    def get_cache_stats(self) -> Dict:
+        """Get response cache hit/revalidation/miss counters."""
+        return self.response_cache.stats()
+    
+    def _make_request(self, method: str, endpoint: str, data=None, cache_ttl: Optional[float] = None):
+        """Make HTTP request to API.
         
+        Args:
+            method: HTTP method
+            endpoint: Path (and query) under the API base URL
+            data: JSON body
+            cache_ttl: For GETs, seconds a cached response is served without
+                asking the server (0 always revalidates with the ETag);
+                None bypasses the cache
+        """
         try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=self.headers)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=self.headers, json=data)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            if response.status_code in [200, 201]:
-                return response.json()
-            else:
-                print(f"API error: {response.status_code}")
-                return None
+            if cache_ttl is not None and method.upper() == 'GET':
+                return self._cached_get(endpoint, cache_ttl)
+            return self._response_data(self._send(method, endpoint, data))
         except requests.exceptions.RequestException as e:
             print(f"API request failed: {e}")
             return None
     
+    @staticmethod
+    def _response_data(response):
+        """Parsed body of a 200/201 response (requests or httpx), else None."""
+        if response.status_code in [200, 201]:
+            return response.json()
+        print(f"API error: {response.status_code}")
+        return None
+    
+    def _cached_get(self, endpoint: str, ttl: float):
+        """GET through the response cache, revalidating stale entries with If-None-Match."""
+        hit, result, headers, generation = self._cache_lookup(endpoint, ttl)
+        if hit:
+            return result
+        done, result = self._cache_response(endpoint, self._send('GET', endpoint, headers=headers), generation)
+        if not done:
+            # Evicted meanwhile; fetch the full response
+            done, result = self._cache_response(endpoint, self._send('GET', endpoint), generation)
+        return result
+    
+    def _cache_lookup(self, endpoint: str, ttl: float):
+        """First step of a cached GET.
+        
+        Returns:
+            Tuple of (hit, result, headers, generation): on a fresh hit,
+            result is the parsed body; otherwise send the GET with
+            ``headers`` and pass the response to _cache_response()
+        """
+        body, etag, generation = self.response_cache.lookup(endpoint, ttl)
+        if body is not None:
+            return True, json.loads(body), None, generation
+        return False, None, {'If-None-Match': etag} if etag else None, generation
+    
+    def _cache_response(self, endpoint: str, response, generation: int):
+        """Second step of a cached GET: cache a 200 or reuse the body a 304 confirmed.
+        
+        Returns:
+            Tuple of (done, result); done is False when a 304's entry was
+            evicted meanwhile and the GET must be sent again without headers
+        """
+        if response.status_code == 304:
+            body = self.response_cache.not_modified(endpoint, generation)
+            if body is None:
+                return False, None
+            return True, json.loads(body)
+        if response.status_code == 200:
+            self.response_cache.store(endpoint, response.headers.get('ETag'), response.text, generation)
+            return True, response.json()
+        print(f"API error: {response.status_code}")
+        return True, None
+    
     # ==================== Authentication ====================
     
     def authenticate_user(self, username: str, password: str) -> Optional[str]:
         """Authenticate user via API."""
         data = {"username": username, "password": password}
         try:
-            url = f"{self.api_base_url}/api/login"
-            response = requests.post(url, json=data)
+            response = self._send('POST', '/api/login', data)
             if response.status_code == 200:
                 result = response.json()
                 return result.get('username') if result.get('success') else None
@@ -54,11 +413,8 @@ class APIDatabase:
     
     def get_user_role(self, username: str) -> Optional[str]:
         """Get user role via API."""
-        users = self.get_all_users()
-        for user in users:
-            if user[0] == username:  # user[0] is username
-                return user[2]  # user[2] is role
-        return None
+        result = self._make_request('GET', f'/api/users/{username}/role', cache_ttl=API_CACHE_TTL)
+        return result.get('role') if result else None
     
     def record_login(self, username: str):
         """Record login."""
@@ -73,13 +429,12 @@ class APIDatabase:
     
     def get_all_events(self) -> Dict:
         """Get all events via API."""
-        result = self._make_request('GET', '/api/events')
+        result = self._make_request('GET', '/api/events', cache_ttl=API_CACHE_TTL)
         return result if result else {}
     
     def get_event_by_id(self, event_id: str) -> Optional[Dict]:
         """Get single event by ID."""
-        events = self.get_all_events()
-        return events.get(event_id)
+        return self._make_request('GET', f'/api/events/{event_id}', cache_ttl=API_CACHE_TTL)
     
     def create_event(self, name: str, date: str, description: str) -> str:
         """Create new event via API."""
@@ -100,8 +455,7 @@ class APIDatabase:
     def delete_event(self, event_id: str) -> bool:
         """Delete event via API."""
         try:
-            url = f"{self.api_base_url}/api/events/{event_id}"
-            response = requests.delete(url, headers=self.headers)
+            response = self._send('DELETE', f'/api/events/{event_id}')
             return response.status_code in [200, 204]
         except Exception as e:
             print(f"Error deleting event: {e}")
@@ -128,25 +482,22 @@ class APIDatabase:
     
     def get_attendance_by_event(self, event_id: str) -> Dict:
         """Get attendance for event via API."""
-        result = self._make_request('GET', f'/api/attendance/{event_id}')
+        result = self._make_request('GET', f'/api/attendance/{event_id}', cache_ttl=0)
         return result if result else {}
     
     def is_user_checked_in(self, event_id: str, user_id: str) -> Optional[str]:
-        """Check if user checked in."""
-        attendance = self.get_attendance_by_event(event_id)
-        if isinstance(attendance, dict):
-            for entry in attendance.get(event_id, []):
-                if entry.get('user_id') == user_id:
-                    return entry.get('status')
-        return None
+        """Check if user checked in; returns the check-in timestamp."""
+        result = self._make_request('GET', f'/api/attendance/{event_id}/{user_id}')
+        return result.get('timestamp') if result else None
     
     def is_checked_in_for_slot(self, event_id: str, user_id: str, time_slot: str) -> Optional[str]:
-        """Check if user checked in for specific slot."""
-        return self.is_user_checked_in(event_id, user_id)
+        """Check if user checked in for specific slot; returns the check-in timestamp."""
+        result = self._make_request('GET', f'/api/attendance/{event_id}/{user_id}/{time_slot}')
+        return result.get('timestamp') if result else None
     
     def get_attendance_summary(self, event_id: str) -> Dict:
         """Get attendance summary."""
-        result = self._make_request('GET', f'/api/attendance-summary/{event_id}')
+        result = self._make_request('GET', f'/api/attendance-summary/{event_id}', cache_ttl=0)
         return result if result else {}
     
     # ==================== Users ====================
@@ -164,23 +515,24 @@ class APIDatabase:
     
     def get_all_users(self) -> List:
         """Get all users via API."""
-        result = self._make_request('GET', '/api/users')
-        if result:
-            # Convert dict format to list of tuples (username, full_name, role)
-            users = []
-            for username, user_data in result.items():
-                if isinstance(user_data, dict):
-                    users.append((username, user_data.get('full_name', username), user_data.get('role', 'scanner')))
-                else:
-                    users.append((username, user_data, 'scanner'))
-            return users
-        return []
+        result = self._make_request('GET', '/api/users', cache_ttl=API_CACHE_TTL)
+        return self._parse_users(result) if result else []
+    
+    @staticmethod
+    def _parse_users(result: Dict) -> List:
+        """Convert the API's user dict to a list of (username, full_name, role) tuples."""
+        users = []
+        for username, user_data in result.items():
+            if isinstance(user_data, dict):
+                users.append((username, user_data.get('full_name', username), user_data.get('role', 'scanner')))
+            else:
+                users.append((username, user_data, 'scanner'))
+        return users
     
     def delete_user(self, username: str) -> bool:
         """Delete user via API."""
         try:
-            url = f"{self.api_base_url}/api/users/{username}"
-            response = requests.delete(url, headers=self.headers)
+            response = self._send('DELETE', f'/api/users/{username}')
             return response.status_code in [200, 204]
         except Exception as e:
             print(f"Error deleting user: {e}")
@@ -189,58 +541,140 @@ class APIDatabase:
     # ==================== Students ====================
     
     def get_student_by_id(self, school_id: str) -> Optional[Dict]:
-        """Get student information by school ID."""
+        """Get student information by school ID (served from the roster cache when warm)."""
+        answered, student = self._lookup_roster(school_id)
+        if answered:
+            return student
         result = self._make_request('GET', f'/api/students/{school_id}')
         return result if result else None
     
-    def create_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
-        """Create or update student via API."""
+    # ==================== Roster Cache ====================
+    
+    def get_roster_version(self) -> Optional[int]:
+        """Get the roster version via API."""
+        result = self._make_request('GET', '/api/students/version')
+        return result.get('version') if result else None
+    
+    def warm_roster_cache(self) -> bool:
+        """Download the roster once so student lookups stay local."""
+        version = self.get_roster_version()
+        students = self._make_request('GET', '/api/students', cache_ttl=0)
+        if version is None or students is None:
+            return False
+        self.roster_cache.load(students, version)
+        print(f"Roster cache warmed with {len(students)} student(s)")
+        return True
+    
+    def get_roster_cache_stats(self) -> Dict:
+        """Get roster cache hit/miss counters."""
+        return self.roster_cache.stats()
+    
+    def _lookup_roster(self, school_id: str):
+        """Answer a student lookup from the roster cache, reloading it if the roster changed."""
+        if self.roster_cache.needs_check():
+            if not self.roster_cache.mark_checked(self.get_roster_version()):
+                self.warm_roster_cache()
+        student = self.roster_cache.lookup(school_id)
+        if student[1]:
+            for field in ('qr_data', 'last_name', 'first_name', 'middle_initial'):
+                student[1].pop(field, None)
+        return student
+    
+    def create_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str = None, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
+        """Create or update student via API (QR images are not sent; they are regenerated from qr_data)."""
         data = {
             "school_id": school_id,
             "name": name,
             "qr_data": qr_data,
-            "qr_data_encoded": qr_data_encoded,
             "csv_data": csv_data,
             "last_name": last_name,
             "first_name": first_name,
             "middle_initial": middle_initial
         }
         result = self._make_request('POST', '/api/students', data)
+        self.roster_cache.invalidate()
         return result is not None
     
-    def update_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
+    def update_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str = None, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
         """Update student via API."""
         data = {
             "name": name,
             "qr_data": qr_data,
-            "qr_data_encoded": qr_data_encoded,
             "csv_data": csv_data,
             "last_name": last_name,
             "first_name": first_name,
             "middle_initial": middle_initial
         }
         result = self._make_request('POST', f'/api/students/{school_id}', data)
+        self.roster_cache.invalidate()
         return result is not None
     
+    def bulk_upsert_students(self, rows: List[Dict]) -> Dict:
+        """Create or update many students via /api/students/bulk, in chunks."""
+        counts = {'inserted': 0, 'updated': 0, 'failed': 0}
+        for i in range(0, len(rows), BULK_IMPORT_CHUNK_SIZE):
+            chunk = rows[i:i + BULK_IMPORT_CHUNK_SIZE]
+            result = self._make_request('POST', '/api/students/bulk', {"students": chunk})
+            if result:
+                for key in counts:
+                    counts[key] += result.get(key, 0)
+            else:
+                counts['failed'] += len(chunk)
+        self.roster_cache.invalidate()
+        return counts
+    
     def get_attendance_by_section(self, event_id: str) -> Dict:
         """Get attendance grouped by year and section."""
-        result = self._make_request('GET', f'/api/attendance-by-section/{event_id}')
+        result = self._make_request('GET', f'/api/attendance-by-section/{event_id}', cache_ttl=0)
         return result if result else {}
     
+    def get_recent_timeslot_scans(self, event_id: str, time_slot: str, limit: int = 15) -> List:
+        """Get the latest check-ins for one event and time slot via API."""
+        result = self._make_request('GET', f'/api/recent-scans/{event_id}/{time_slot}?limit={limit}', cache_ttl=0)
+        return result if result else []
+    
     def check_timeslot_attendance(self, event_id: str, school_id: str, time_slot: str) -> bool:
         """Check if student already checked in for time slot."""
         result = self._make_request('GET', f'/api/check-timeslot/{event_id}/{school_id}/{time_slot}')
         return result.get('checked_in', False) if result else False
     
-    def record_timeslot_attendance(self, event_id: str, school_id: str, time_slot: str) -> bool:
-        """Record attendance for specific time slot."""
+    def record_timeslot_attendance(self, event_id: str, school_id: str, time_slot: str) -> Dict:
+        """Record attendance for specific time slot (reports already-present slots)."""
         data = {
             "event_id": event_id,
             "school_id": school_id,
             "time_slot": time_slot
         }
         result = self._make_request('POST', '/api/record-timeslot', data)
-        return result is not None
+        if not result:
+            return {'success': False, 'already_present': False}
+        return {
+            'success': result.get('success', True),
+            'already_present': result.get('already_present', False)
+        }
+    
+    def process_scan(self, event_id: str, qr_payload: str, time_slot: str,
+                     scanner: Optional[str] = None) -> Dict:
+        """Process a scan with a single API call (see Database.process_scan).
+        
+        Unknown IDs are rejected locally when the roster cache is warm.
+        """
+        school_id = (qr_payload or '').split('|')[0].strip()
+        if school_id:
+            answered, student = self._lookup_roster(school_id)
+            if answered and student is None:
+                return {'status': 'student_not_found', 'student': None, 'time_slot': time_slot, 'summary': {}, 'recorded_time': None}
+        
+        data = {
+            "event_id": event_id,
+            "qr_payload": qr_payload,
+            "time_slot": time_slot,
+            "scanner_username": scanner
+        }
+        result = self._make_request('POST', '/api/scan', data)
+        if not result:
+            return {'status': 'error', 'student': None, 'time_slot': time_slot, 'summary': {}, 'recorded_time': None}
+        return result
     
     # ==================== Activity Logging ====================
     
@@ -251,12 +685,12 @@ class APIDatabase:
     
     def get_recent_scans(self, limit: int = 10) -> List:
         """Get recent scans via API."""
-        result = self._make_request('GET', f'/api/recent-scans?limit={limit}')
+        result = self._make_request('GET', f'/api/recent-scans?limit={limit}', cache_ttl=0)
         return result if result else []
     
     def get_recent_logins(self, limit: int = 10) -> List:
         """Get recent logins via API."""
-        result = self._make_request('GET', f'/api/recent-logins?limit={limit}')
+        result = self._make_request('GET', f'/api/recent-logins?limit={limit}', cache_ttl=0)
         return result if result else []
     
     def get_scans_by_scanner(self, username: str, limit: int = 10):
@@ -7,6 +7,7 @@ from functools import wraps
 import os
 from dotenv import load_dotenv
 from database.db_manager import Database
+from config.constants import TIME_SLOTS
 
 # Load environment variables
 load_dotenv()
@@ -15,8 +16,9 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Initialize database
+# Initialize database and keep the student roster in memory for /api/scan
 db = Database()
+db.warm_roster_cache()
 
 # Configuration
 API_KEY = os.getenv('API_KEY', 'QRAttendanceAPI_SecureKey_789!@#$%')
@@ -110,6 +112,19 @@ def get_events():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/events/<event_id>', methods=['GET'])
+@require_api_key
+def get_event(event_id):
+    """Get a single event."""
+    try:
+        event = db.get_event_by_id(event_id)
+        if event:
+            return jsonify(event), 200
+        else:
+            return jsonify({'error': 'Event not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/events', methods=['POST'])
 @require_api_key
 def create_event():
@@ -189,6 +204,19 @@ def get_user_by_username(username):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/users/<username>/role', methods=['GET'])
+@require_api_key
+def get_user_role(username):
+    """Get a user's role."""
+    try:
+        role = db.get_user_role(username)
+        if role:
+            return jsonify({'username': username, 'role': role}), 200
+        else:
+            return jsonify({'error': 'User not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/users/<username>', methods=['DELETE'])
 @require_api_key
 def delete_user(username):
@@ -234,6 +262,19 @@ def recent_scans():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/recent-scans/<event_id>/<time_slot>', methods=['GET'])
+@require_api_key
+def recent_timeslot_scans(event_id, time_slot):
+    """Get the latest check-ins for one event and time slot."""
+    try:
+        if time_slot not in TIME_SLOTS:
+            return jsonify({'error': 'Invalid time slot'}), 400
+        limit = request.args.get('limit', 15, type=int)
+        scans = db.get_recent_timeslot_scans(event_id, time_slot, limit)
+        return jsonify(scans), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/recent-logins', methods=['GET'])
 @require_api_key
 def recent_logins():
@@ -255,13 +296,38 @@ def get_attendance(event_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/attendance/<event_id>/<user_id>', methods=['GET'])
+@require_api_key
+def get_user_attendance(event_id, user_id):
+    """Check whether one user checked in for an event (any time slot)."""
+    try:
+        timestamp = db.is_user_checked_in(event_id, user_id)
+        return jsonify({'checked_in': timestamp is not None, 'timestamp': timestamp}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/<event_id>/<user_id>/<time_slot>', methods=['GET'])
+@require_api_key
+def get_user_slot_attendance(event_id, user_id, time_slot):
+    """Check whether one user checked in for a specific time slot."""
+    try:
+        if time_slot not in TIME_SLOTS:
+            return jsonify({'error': 'Invalid time slot'}), 400
+        timestamp = db.is_checked_in_for_slot(event_id, user_id, time_slot)
+        return jsonify({'checked_in': timestamp is not None, 'timestamp': timestamp}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/students', methods=['GET'])
 @require_api_key
 def get_all_students():
     """Get all students."""
     try:
         # Query all students from database
-        students = db._execute("SELECT school_id, name, last_name, first_name, middle_initial FROM students_qrcodes ORDER BY school_id", fetch_all=True)
+        students = db._execute("""
+            SELECT school_id, name, last_name, first_name, middle_initial, year_level, section, qr_data
+            FROM students_qrcodes ORDER BY school_id
+            """, fetch_all=True)
         
         if students:
             result = []
@@ -271,7 +337,10 @@ def get_all_students():
                     'name': student[1],
                     'last_name': student[2],
                     'first_name': student[3],
-                    'middle_initial': student[4]
+                    'middle_initial': student[4],
+                    'year_level': student[5],
+                    'section': student[6],
+                    'qr_data': student[7]
                 })
             return jsonify(result), 200
         else:
@@ -279,6 +348,15 @@ def get_all_students():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/students/version', methods=['GET'])
+@require_api_key
+def get_roster_version():
+    """Get the roster version (changes whenever any student is added or updated)."""
+    try:
+        return jsonify({'version': db.get_roster_version()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/students/<school_id>', methods=['GET'])
 @require_api_key
 def get_student(school_id):
@@ -301,62 +379,43 @@ def create_student():
         school_id = data.get('school_id')
         name = data.get('name')
         qr_data = data.get('qr_data')
-        qr_data_encoded = data.get('qr_data_encoded')
         csv_data = data.get('csv_data')
         last_name = data.get('last_name')
         first_name = data.get('first_name')
         middle_initial = data.get('middle_initial')
         
-        if not all([school_id, name, qr_data, qr_data_encoded]):
+        # qr_data_encoded is no longer required; images are regenerated from qr_data
+        if not all([school_id, name, qr_data]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        # Ensure table exists with new columns
-        db._execute("""
-        CREATE TABLE IF NOT EXISTS students_qrcodes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            school_id TEXT NOT NULL UNIQUE,
-            name TEXT NOT NULL,
-            last_name TEXT,
-            first_name TEXT,
-            middle_initial TEXT,
-            qr_data TEXT NOT NULL UNIQUE,
-            qr_data_encoded TEXT NOT NULL,
-            csv_data TEXT,
-            created_at TEXT NOT NULL
-        )
-        """)
-        
-        # Ensure new columns exist (migration)
-        try:
-            db._add_column_if_not_exists('students_qrcodes', 'last_name', 'TEXT')
-            db._add_column_if_not_exists('students_qrcodes', 'first_name', 'TEXT')
-            db._add_column_if_not_exists('students_qrcodes', 'middle_initial', 'TEXT')
-        except:
-            pass
-        
         # Check if student exists
         existing = db._execute("SELECT id FROM students_qrcodes WHERE school_id = ?", (school_id,), fetch_one=True)
         
-        if existing:
-            # Update
-            db._execute("""
-            UPDATE students_qrcodes 
-            SET name = ?, qr_data = ?, qr_data_encoded = ?, csv_data = ?, last_name = ?, first_name = ?, middle_initial = ?
-            WHERE school_id = ?
-            """, (name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial, school_id))
-        else:
-            # Insert
-            from datetime import datetime
-            db._execute("""
-            INSERT INTO students_qrcodes 
-            (school_id, name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (school_id, name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial, datetime.now().isoformat()))
+        # Database normalizes csv_data and fills course/year/section columns
+        save = db.update_student if existing else db.create_student
+        if not save(school_id, name, qr_data, None, csv_data, last_name, first_name, middle_initial):
+            return jsonify({'error': 'Failed to save student'}), 500
         
         return jsonify({'success': True, 'message': 'Student saved', 'school_id': school_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/students/bulk', methods=['POST'])
+@require_api_key
+def bulk_upsert_students():
+    """Create or update a batch of students in one transaction."""
+    try:
+        data = request.get_json()
+        students = data.get('students')
+        
+        if not isinstance(students, list):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        counts = db.bulk_upsert_students(students)
+        return jsonify({'success': True, **counts}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/students/<school_id>', methods=['POST'])
 @require_api_key
 def update_student(school_id):
@@ -365,14 +424,14 @@ def update_student(school_id):
         data = request.get_json()
         name = data.get('name')
         qr_data = data.get('qr_data')
-        qr_data_encoded = data.get('qr_data_encoded')
         csv_data = data.get('csv_data')
+        last_name = data.get('last_name')
+        first_name = data.get('first_name')
+        middle_initial = data.get('middle_initial')
         
-        db._execute("""
-        UPDATE students_qrcodes 
-        SET name = ?, qr_data = ?, qr_data_encoded = ?, csv_data = ?
-        WHERE school_id = ?
-        """, (name, qr_data, qr_data_encoded, csv_data, school_id))
+        if not db.update_student(school_id, name, qr_data, None, csv_data,
+                                 last_name, first_name, middle_initial):
+            return jsonify({'error': 'Failed to update student'}), 500
         
         return jsonify({'success': True, 'message': 'Student updated'}), 200
     except Exception as e:
@@ -393,6 +452,9 @@ def get_attendance_by_section(event_id):
 def check_timeslot(event_id, school_id, time_slot):
     """Check if student already checked in for time slot."""
     try:
+        # The slot names a column, so only known slots may reach the query
+        if time_slot not in TIME_SLOTS:
+            return jsonify({'error': 'Invalid time slot'}), 400
         checked_in = db.check_timeslot_attendance(event_id, school_id, time_slot)
         return jsonify({'checked_in': checked_in}), 200
     except Exception as e:
@@ -411,14 +473,37 @@ def record_timeslot():
         if not all([event_id, school_id, time_slot]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        success = db.record_timeslot_attendance(event_id, school_id, time_slot)
-        if success:
-            return jsonify({'success': True, 'message': 'Timeslot attendance recorded'}), 200
+        result = db.record_timeslot_attendance(event_id, school_id, time_slot)
+        if result['success']:
+            return jsonify({
+                'success': True,
+                'already_present': result['already_present'],
+                'message': 'Already checked in' if result['already_present'] else 'Timeslot attendance recorded'
+            }), 200
         else:
             return jsonify({'error': 'Failed to record attendance'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/scan', methods=['POST'])
+@require_api_key
+def process_scan():
+    """Process one QR scan (lookup, duplicate check, record, audit) in one call."""
+    try:
+        data = request.get_json()
+        event_id = data.get('event_id')
+        qr_payload = data.get('qr_payload')
+        time_slot = data.get('time_slot')
+        scanner_username = data.get('scanner_username')
+        
+        if not all([event_id, qr_payload, time_slot]):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        result = db.process_scan(event_id, qr_payload, time_slot, scanner_username)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/attendance-summary/<event_id>', methods=['GET'])
 @require_api_key
 def get_attendance_summary(event_id):
@@ -429,6 +514,22 @@ def get_attendance_summary(event_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# CONDITIONAL GET
+# ============================================================================
+
+@app.after_request
+def add_etag(response):
+    """Tag GET responses with an ETag and answer a matching If-None-Match with 304.
+    
+    Clients that kept the previous response get an empty 304 instead of the
+    full payload when nothing changed.
+    """
+    if request.method == 'GET' and response.status_code == 200 and not response.direct_passthrough:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
 # ============================================================================
 # ERROR HANDLERS
 # ============================================================================
@@ -5,6 +5,7 @@ import flet as ft
 import time
 from config.constants import *
 from database.db_manager import Database
+from database.async_db import make_async_db
 from api_db_manager import APIDatabase
 from remote_config import API_BASE_URL, API_KEY, USE_REMOTE_DATABASE
 from views.login_view import LoginView
@@ -30,6 +31,8 @@ class MaScanApp:
         else:
             print(f"DEBUG: Using LOCAL database")
             self.db = Database(DATABASE_NAME)
+        # Awaitable view of the same database for async page handlers
+        self.adb = make_async_db(self.db)
         
         self.current_user = None
         self.drawer = None
@@ -55,6 +58,9 @@ class MaScanApp:
         # Setup routing
         self.page.on_route_change = self.route_change
         self.page.on_view_pop = self.view_pop
+        # Release this session's HTTP connections when its page goes away
+        self.page.on_disconnect = self.close_connections
+        self.page.on_close = self.close_connections
         
         # Initialize
         self.page.go("/")
@@ -75,7 +81,11 @@ class MaScanApp:
                 import traceback
                 traceback.print_exc()
 
-    def route_change(self, e):
+    async def close_connections(self, e):
+        """Close the async database client (it reconnects lazily if the page comes back)."""
+        await self.adb.aclose()
+
+    async def route_change(self, e):
         """Handle route changes safely and render fallback on errors."""
         print(f"DEBUG: Route change to {self.page.route}")
 
@@ -95,56 +105,56 @@ class MaScanApp:
             if route == "/":
                 new_view = self.login_view.build()
             elif route == "/home":
-                new_view = self.home_view.build() if self.current_user else self.login_view.build()
+                new_view = await self.home_view.build() if self.current_user else self.login_view.build()
             elif route == "/create_event":
                 if not self.current_user:
                     new_view = self.login_view.build()
                 else:
-                    user_role = self.db.get_user_role(self.current_user)
+                    user_role = await self.adb.get_user_role(self.current_user)
                     if user_role != 'admin':
                         self.show_snackbar("Only admins can create events", ft.Colors.RED)
-                        new_view = self.home_view.build()
+                        new_view = await self.home_view.build()
                     else:
                         new_view = self.create_event_view.build()
             elif route.startswith("/event/"):
                 event_id = route.split("/")[-1]
-                new_view = self.event_view.build(event_id) if self.current_user else self.login_view.build()
+                new_view = await self.event_view.build(event_id) if self.current_user else self.login_view.build()
             elif route.startswith("/scan/"):
                 event_id = route.split("/")[-1]
-                new_view = self.scan_view.build(event_id) if self.current_user else self.login_view.build()
+                new_view = await self.scan_view.build(event_id) if self.current_user else self.login_view.build()
             elif route == "/qr_generator":
                 if not self.current_user:
                     new_view = self.login_view.build()
                 else:
-                    user_role = self.db.get_user_role(self.current_user)
+                    user_role = await self.adb.get_user_role(self.current_user)
                     if user_role != 'admin':
                         self.show_snackbar("Only admins can generate QR codes", ft.Colors.RED)
-                        new_view = self.home_view.build()
+                        new_view = await self.home_view.build()
                     else:
                         new_view = self.qr_generator_view.build()
             elif route == "/user_management":
                 if not self.current_user:
                     new_view = self.login_view.build()
                 else:
-                    user_role = self.db.get_user_role(self.current_user)
+                    user_role = await self.adb.get_user_role(self.current_user)
                     if user_role != 'admin':
                         self.show_snackbar("Only admins can access user management", ft.Colors.RED)
-                        new_view = self.home_view.build() if self.current_user else self.login_view.build()
+                        new_view = await self.home_view.build() if self.current_user else self.login_view.build()
                     else:
                         new_view = self.user_management_view.build()
             elif route == "/activity_log":
                 if not self.current_user:
                     new_view = self.login_view.build()
                 else:
-                    user_role = self.db.get_user_role(self.current_user)
+                    user_role = await self.adb.get_user_role(self.current_user)
                     if user_role != 'admin':
                         self.show_snackbar("Only admins can access activity log", ft.Colors.RED)
-                        new_view = self.home_view.build()
+                        new_view = await self.home_view.build()
                     else:
-                        new_view = self.activity_log_view.build()
+                        new_view = await self.activity_log_view.build()
             else:
                 print(f"WARNING: Unknown route {route}, showing home view")
-                new_view = self.home_view.build() if self.current_user else self.login_view.build()
+                new_view = await self.home_view.build() if self.current_user else self.login_view.build()
 
             # Append the constructed view and update page
             if new_view is not None:
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Offline attendance from recorded entrance footage.
+
+Decodes QR codes from a video file or a folder of images on a process pool,
+applies the same cooldown as the live scanner (so a student held in view is
+counted once), and bulk-records everyone found into the event's time slot.
+Each student is recorded at the wall-clock time their code first appeared:
+the recording start (``--start``, or the source's modification time minus
+its length) plus the frame's offset into the footage.
+
+Usage:
+    python batch_decode.py --event <event_id> --slot morning entrance.mp4
+    python batch_decode.py --event <event_id> --slot lunch photos/ --fps 2
+    python batch_decode.py --event <event_id> --slot morning gate.mp4 --start "2025-01-15 07:30:00"
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+from pyzbar import pyzbar
+from config.constants import DATABASE_NAME, TIME_SLOTS, QR_SCAN_COOLDOWN, CAMERA_FPS
+from database.db_manager import Database
+from utils.frame_sources import IMAGE_EXTENSIONS, open_frame_source
+from utils.qr_scanner import ScanCooldown
+
+CHUNK_SIZE = 16  # frames per worker task
+
+
+def iter_frames(path: str, fps: float):
+    """Yield (timestamp_seconds, frame) from a video or stream, or (timestamp, image_path) from a folder.
+    
+    Video frames are converted to grayscale here so less data is sent to the
+    workers; image files are loaded by the workers themselves.
+    """
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(names):
+            yield index / fps, os.path.join(path, name)
+        return
+    
+    source = open_frame_source(path)
+    if not source.open():
+        raise ValueError(f"Could not open {source}")
+    source_fps = source.fps or fps
+    index = 0
+    try:
+        while True:
+            ret, frame = source.read()
+            if not ret:
+                break
+            yield index / source_fps, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            index += 1
+    finally:
+        source.release()
+
+
+def _decode_chunk(items):
+    """Worker task: decode QR payloads from a chunk of frames or image paths."""
+    results = []
+    for timestamp, frame in items:
+        if isinstance(frame, str):
+            frame = cv2.imread(frame, cv2.IMREAD_GRAYSCALE)
+        payloads = []
+        if frame is not None:
+            payloads = [obj.data.decode('utf-8', errors='replace') for obj in pyzbar.decode(frame)]
+        results.append((timestamp, payloads))
+    return results
+
+
+def decode_frames(path: str, fps: float, workers: int = 0):
+    """Yield (timestamp, payloads) for every frame in order, decoding chunks in parallel."""
+    workers = workers or os.cpu_count() or 1
+    frames = iter_frames(path, fps)
+    
+    def next_chunk():
+        chunk = []
+        for item in frames:
+            chunk.append(item)
+            if len(chunk) == CHUNK_SIZE:
+                break
+        return chunk
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        # Keep a bounded number of chunks in flight so long videos use flat memory
+        while True:
+            while len(pending) < workers * 2:
+                chunk = next_chunk()
+                if not chunk:
+                    break
+                pending.append(executor.submit(_decode_chunk, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record attendance from recorded video or images")
+    parser.add_argument("source", help="Video file or folder of images")
+    parser.add_argument("--event", required=True, help="Event ID to record attendance for")
+    parser.add_argument("--slot", required=True, choices=TIME_SLOTS, help="Time slot to mark Present")
+    parser.add_argument("--db", default=DATABASE_NAME, help="SQLite database file")
+    parser.add_argument("--fps", type=float, default=CAMERA_FPS,
+                        help="Frame rate assumed for image folders (videos use their own)")
+    parser.add_argument("--cooldown", type=float, default=QR_SCAN_COOLDOWN, help="Seconds between repeat scans")
+    parser.add_argument("--workers", type=int, default=0, help="Decode processes (0 = one per CPU)")
+    parser.add_argument("--start", type=datetime.fromisoformat,
+                        help="When the recording began, e.g. '2025-01-15 07:30:00' "
+                             "(default: when the source was last modified, minus its length)")
+    parser.add_argument("--dry-run", action="store_true", help="Decode and report without recording")
+    args = parser.parse_args()
+    
+    db = Database(args.db)
+    if not db.get_event_by_id(args.event):
+        print(f"❌ Event not found: {args.event}")
+        sys.exit(1)
+    
+    cooldown = ScanCooldown(args.cooldown)
+    frames = 0
+    detections = 0
+    school_ids = []
+    first_seen = {}
+    last_timestamp = 0.0
+    start = time.perf_counter()
+    
+    for timestamp, payloads in decode_frames(args.source, args.fps, args.workers):
+        frames += 1
+        last_timestamp = timestamp
+        for qr_data in payloads:
+            detections += 1
+            if cooldown.allow(qr_data, timestamp):
+                school_id = qr_data.split('|')[0].strip()
+                if school_id:
+                    school_ids.append(school_id)
+                    first_seen.setdefault(school_id, timestamp)
+    
+    elapsed = time.perf_counter() - start
+    print(f"Decoded {frames} frame(s) in {elapsed:.1f}s ({frames / elapsed if elapsed else 0:.1f} frames/sec)")
+    print(f"{detections} QR detection(s), {len(school_ids)} scan(s) after cooldown, "
+          f"{len(set(school_ids))} unique student(s)")
+    
+    if args.dry_run:
+        return
+    
+    if args.start:
+        recording_start = args.start
+    else:
+        # A file was last written when recording ended; a stream or camera ended just now
+        ended = (datetime.fromtimestamp(os.path.getmtime(args.source))
+                 if os.path.exists(args.source) else datetime.now())
+        recording_start = ended - timedelta(seconds=last_timestamp)
+    scanned_at = {school_id: recording_start + timedelta(seconds=offset)
+                  for school_id, offset in first_seen.items()}
+    counts = db.bulk_record_timeslot_attendance(args.event, school_ids, args.slot, scanned_at)
+    print(f"✅ Recorded {counts['recorded']} student(s) for {args.slot}; "
+          f"{counts['already_present']} already present, {counts['not_found']} not on the roster")
+
+
+if __name__ == "__main__":
+    main()
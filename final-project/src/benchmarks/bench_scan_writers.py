@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent scan writers against the attendance database.
+
+Each writer process plays the role of one scanning client (a Flet app or an
+API server worker) and records attendance for its own block of students.
+The same workload runs once with SQLite's legacy rollback journal and once
+with the configured storage profile, reporting throughput and dropped scans.
+
+Usage:
+    python benchmarks/bench_scan_writers.py --writers 4 --scans 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.constants import DB_STORAGE_PROFILE
+from database.db_manager import Database
+
+# SQLite defaults before the storage profile was introduced
+LEGACY_PROFILE = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+
+def _writer(db_path: str, profile: dict, event_id: str, first: int, count: int) -> float:
+    """Record ``count`` scans for students ``first..first+count`` and return elapsed seconds."""
+    db = Database(db_path, storage_profile=profile)
+    start = time.perf_counter()
+    for n in range(first, first + count):
+        school_id = f"S{n:06d}"
+        student = db.get_student_by_id(school_id)
+        db.record_timeslot_attendance(event_id, school_id, "morning")
+        db.record_scan("bench", school_id, student["name"] if student else school_id, event_id)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def run_profile(name: str, profile: dict, writers: int, scans: int) -> dict:
+    """Run the concurrent writer workload against a fresh database."""
+    workdir = tempfile.mkdtemp(prefix="mascan_bench_")
+    db_path = os.path.join(workdir, f"{name}.db")
+    
+    db = Database(db_path, storage_profile=profile)
+    event_id = db.create_event("Benchmark", "2099-01-01", "Concurrent writers")
+    for n in range(writers * scans):
+        school_id = f"S{n:06d}"
+        db.create_student(school_id, f"Student {n}", f"{school_id}|Student {n}", "")
+    
+    args = [(db_path, profile, event_id, w * scans, scans) for w in range(writers)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(writers) as pool:
+        pool.starmap(_writer, args)
+    wall = time.perf_counter() - start
+    
+    recorded = db._execute(
+        "SELECT COUNT(*) FROM attendance_timeslots WHERE event_id = ?", (event_id,), fetch_one=True
+    )[0]
+    db.close()
+    
+    expected = writers * scans
+    return {
+        "profile": name,
+        "scans": expected,
+        "recorded": recorded,
+        "dropped": expected - recorded,
+        "seconds": wall,
+        "scans_per_sec": expected / wall if wall else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4, help="concurrent writer processes")
+    parser.add_argument("--scans", type=int, default=300, help="scans per writer")
+    args = parser.parse_args()
+    
+    results = [
+        run_profile("legacy", LEGACY_PROFILE, args.writers, args.scans),
+        run_profile("tuned", DB_STORAGE_PROFILE, args.writers, args.scans),
+    ]
+    
+    print()
+    print(f"{'profile':<8} {'scans':>7} {'recorded':>9} {'dropped':>8} {'seconds':>8} {'scans/s':>9}")
+    for r in results:
+        print(f"{r['profile']:<8} {r['scans']:>7} {r['recorded']:>9} {r['dropped']:>8} "
+              f"{r['seconds']:>8.2f} {r['scans_per_sec']:>9.1f}")
+    if results[0]["scans_per_sec"]:
+        print(f"\nThroughput gain: {results[1]['scans_per_sec'] / results[0]['scans_per_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,12 +24,69 @@ DEFAULT_PASSWORD = "admin123"
 
 # Database
 DATABASE_NAME = "mascan_attendance.db"
+DB_POOL_SIZE = 8  # max concurrent SQLite connections per Database instance
+
+# SQLite storage profile applied when the database is opened.
+# journal_mode is stored in the database file; the rest apply per connection.
+DB_STORAGE_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 64 * 1024 * 1024,
+    "cache_size": -16000,  # negative means KiB (~16 MB page cache)
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms to wait on a lock before SQLITE_BUSY
+}
+DB_BUSY_RETRIES = 5
+DB_BUSY_BACKOFF = 0.05  # seconds, doubled after each busy retry
+ASYNC_DB_WORKERS = 4  # threads, shared by all sessions, that run awaited SQLite calls
+
+# Students sent per request when bulk importing a roster through the API
+BULK_IMPORT_CHUNK_SIZE = 500
+
+# Remote API client
+API_CONNECT_TIMEOUT = 3  # seconds to open a connection to the API server
+API_READ_TIMEOUT = 10  # seconds to wait for a response
+API_POOL_SIZE = 8  # keep-alive connections held open to the API server
+API_RETRIES = 2  # extra attempts for idempotent requests (GET, DELETE)
+API_RETRY_BACKOFF = 0.2  # seconds, doubled after each retry, with random jitter
+API_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)  # histogram bucket upper bounds
+API_CACHE_TTL = 5  # seconds cached events and users are served without asking the server
+API_CACHE_MAX_ENTRIES = 128  # GET responses kept for ETag revalidation
+
+# Seconds a warm roster cache trusts its version before re-checking it
+ROSTER_CACHE_TTL = 10
+
+# Attendance time slots (columns in attendance_timeslots)
+TIME_SLOTS = ("morning", "lunch", "afternoon")
 
 # Camera settings
 CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 CAMERA_FPS = 20
 QR_SCAN_COOLDOWN = 2  # seconds
+SCAN_COOLDOWN_MAX_ENTRIES = 1024  # identities remembered by the scan cooldown table
+SCAN_QUEUE_SIZE = 32  # scans waiting to be processed before new ones are rejected
+
+# Scanner frame pipeline
+SCAN_IDLE_FPS = 8  # capture rate while the scene is static
+SCAN_DECODE_SCALE = 1.0  # downscale factor applied before decoding
+SCAN_ROI_FRACTION = 1.0  # centred crop (fraction of width/height) that is decoded
+SCAN_MOTION_THRESHOLD = 2.0  # mean grey-level change that counts as motion
+SCAN_FORCE_DECODE_INTERVAL = 1.0  # seconds; decode at least this often even when static
+SCAN_SETTLE_TIME = 0.5  # seconds after the last motion during which every frame is still decoded
+PREVIEW_ENABLED = True  # False for headless kiosks: decode only, no preview stream
+PREVIEW_FPS = 15  # max camera preview frames pushed to the UI per second
+PREVIEW_JPEG_QUALITY = 70  # JPEG quality (0-100) of preview frames
+PREVIEW_WIDTH = 480  # preview frames are downscaled to this width (0 = camera resolution)
+
+# QR code generation
+QR_BOX_SIZE = 10  # pixels per QR module for full-resolution images
+QR_BORDER = 2  # quiet zone in modules
+QR_GENERATOR_WORKERS = 0  # worker processes; 0 means one per CPU
+QR_GENERATOR_CHUNK_SIZE = 25  # payloads rendered per worker task
+QR_THUMBNAIL_BOX_SIZE = 4  # pixels per QR module for preview thumbnails
+QR_THUMBNAIL_CACHE_SIZE = 256  # thumbnails kept in memory
+QR_PREVIEW_PAGE_SIZE = 24  # thumbnails per preview page
 
 # Colors
 PRIMARY_COLOR = "#2A73FF"  # Blue 600
@@ -1,4 +1,4 @@
 # src/database/__init__.py
 """Database package."""
 
-from .db_manager import Database
\ No newline at end of file
+from .db_manager import Database, ConnectionPool
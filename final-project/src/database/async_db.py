@@ -0,0 +1,220 @@
+# database/async_db.py
+"""Awaitable facades over Database and APIDatabase for Flet's async handlers."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import httpx
+from api_db_manager import APIDatabase, RequestAttempts
+from config.constants import (
+    ASYNC_DB_WORKERS, API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_POOL_SIZE, API_CACHE_TTL
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by every facade in the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ASYNC_DB_WORKERS, thread_name_prefix="async-db")
+        return _executor
+
+
+class AsyncDatabase:
+    """Awaitable wrapper around a Database.
+    
+    Every method of the wrapped database can be awaited; the call runs on a
+    small thread pool shared by all sessions, so page handlers never block
+    the event loop and many web sessions don't each need their own threads.
+    """
+    
+    def __init__(self, db):
+        """Initialize the facade.
+        
+        Args:
+            db: Database (or APIDatabase) instance to wrap
+        """
+        self.db = db
+    
+    async def aclose(self):
+        """Release per-session resources (nothing to release for a local database)."""
+    
+    async def run(self, func, *args, **kwargs):
+        """Run any blocking callable on the shared pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+    
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+        
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        
+        call.__name__ = name
+        return call
+
+
+class AsyncAPIDatabase(AsyncDatabase):
+    """Awaitable wrapper around an APIDatabase.
+    
+    The calls the views make most (scans, events, attendance and activity)
+    go straight to the API over httpx.AsyncClient, so waiting on the network
+    holds no thread at all; everything else falls back to the shared pool.
+    """
+    
+    def __init__(self, db: APIDatabase):
+        super().__init__(db)
+        self._client = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so it belongs to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.db.api_base_url,
+                headers=self.db.headers,
+                timeout=httpx.Timeout(API_READ_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=API_POOL_SIZE, max_keepalive_connections=API_POOL_SIZE)
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the HTTP client's connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _send(self, method: str, endpoint: str, data=None, headers: Optional[Dict] = None) -> httpx.Response:
+        """Send a request with the same retries, latency stats and cache invalidation as APIDatabase._send.
+        
+        Raises:
+            httpx.HTTPError: If the last attempt fails
+        """
+        attempts = RequestAttempts(self.db, method, endpoint)
+        while True:
+            attempts.start()
+            try:
+                response = await self._get_client().request(attempts.method, endpoint, json=data, headers=headers)
+            except httpx.TransportError as e:
+                delay = attempts.failed(e)
+            else:
+                delay = attempts.completed(response.status_code)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+    
+    async def _request(self, method: str, endpoint: str, data=None, cache_ttl: Optional[float] = None):
+        """Make an HTTP request to the API (see APIDatabase._make_request)."""
+        try:
+            if cache_ttl is not None and method.upper() == 'GET':
+                return await self._cached_get(endpoint, cache_ttl)
+            return APIDatabase._response_data(await self._send(method, endpoint, data))
+        except httpx.HTTPError as e:
+            print(f"API request failed: {e}")
+            return None
+    
+    async def _cached_get(self, endpoint: str, ttl: float):
+        """GET through the APIDatabase's response cache (see APIDatabase._cached_get)."""
+        hit, result, headers, generation = self.db._cache_lookup(endpoint, ttl)
+        if hit:
+            return result
+        response = await self._send('GET', endpoint, headers=headers)
+        done, result = self.db._cache_response(endpoint, response, generation)
+        if not done:
+            done, result = self.db._cache_response(endpoint, await self._send('GET', endpoint), generation)
+        return result
+    
+    # ==================== Users ====================
+    
+    async def get_all_users(self) -> List:
+        """Get all users via API."""
+        result = await self._request('GET', '/api/users', cache_ttl=API_CACHE_TTL)
+        return APIDatabase._parse_users(result) if result else []
+    
+    async def get_user_role(self, username: str) -> Optional[str]:
+        """Get user role via API."""
+        result = await self._request('GET', f'/api/users/{username}/role', cache_ttl=API_CACHE_TTL)
+        return result.get('role') if result else None
+    
+    # ==================== Events ====================
+    
+    async def get_all_events(self) -> Dict:
+        """Get all events via API."""
+        result = await self._request('GET', '/api/events', cache_ttl=API_CACHE_TTL)
+        return result if result else {}
+    
+    async def get_event_by_id(self, event_id: str) -> Optional[Dict]:
+        """Get single event by ID."""
+        return await self._request('GET', f'/api/events/{event_id}', cache_ttl=API_CACHE_TTL)
+    
+    async def delete_event(self, event_id: str) -> bool:
+        """Delete event via API."""
+        try:
+            response = await self._send('DELETE', f'/api/events/{event_id}')
+            return response.status_code in [200, 204]
+        except httpx.HTTPError as e:
+            print(f"Error deleting event: {e}")
+            return False
+    
+    # ==================== Attendance ====================
+    
+    async def get_attendance_summary(self, event_id: str) -> Dict:
+        """Get attendance summary."""
+        result = await self._request('GET', f'/api/attendance-summary/{event_id}', cache_ttl=0)
+        return result if result else {}
+    
+    async def get_attendance_by_section(self, event_id: str) -> Dict:
+        """Get attendance grouped by year and section."""
+        result = await self._request('GET', f'/api/attendance-by-section/{event_id}', cache_ttl=0)
+        return result if result else {}
+    
+    async def get_recent_timeslot_scans(self, event_id: str, time_slot: str, limit: int = 15) -> List:
+        """Get the latest check-ins for one event and time slot via API."""
+        result = await self._request('GET', f'/api/recent-scans/{event_id}/{time_slot}?limit={limit}', cache_ttl=0)
+        return result if result else []
+    
+    async def process_scan(self, event_id: str, qr_payload: str, time_slot: str,
+                           scanner: Optional[str] = None) -> Dict:
+        """Process a scan with a single API call (see APIDatabase.process_scan)."""
+        school_id = (qr_payload or '').split('|')[0].strip()
+        if school_id:
+            # The roster cache may need to re-check its version, which is a blocking call
+            answered, student = await self.run(self.db._lookup_roster, school_id)
+            if answered and student is None:
+                return {'status': 'student_not_found', 'student': None, 'time_slot': time_slot, 'summary': {}, 'recorded_time': None}
+        
+        data = {
+            "event_id": event_id,
+            "qr_payload": qr_payload,
+            "time_slot": time_slot,
+            "scanner_username": scanner
+        }
+        result = await self._request('POST', '/api/scan', data)
+        if not result:
+            return {'status': 'error', 'student': None, 'time_slot': time_slot, 'summary': {}, 'recorded_time': None}
+        return result
+    
+    # ==================== Activity Logging ====================
+    
+    async def get_recent_scans(self, limit: int = 10) -> List:
+        """Get recent scans via API."""
+        result = await self._request('GET', f'/api/recent-scans?limit={limit}', cache_ttl=0)
+        return result if result else []
+    
+    async def get_recent_logins(self, limit: int = 10) -> List:
+        """Get recent logins via API."""
+        result = await self._request('GET', f'/api/recent-logins?limit={limit}', cache_ttl=0)
+        return result if result else []
+
+
+def make_async_db(db):
+    """Wrap ``db`` in the matching async facade."""
+    if isinstance(db, APIDatabase):
+        return AsyncAPIDatabase(db)
+    return AsyncDatabase(db)
@@ -4,50 +4,253 @@
 import sqlite3
 import time
 import random
+import json
+import ast
+import queue
+import threading
 import bcrypt
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from database.roster_cache import RosterCache
+from config.constants import (
+    DB_POOL_SIZE, DB_STORAGE_PROFILE, DB_BUSY_RETRIES, DB_BUSY_BACKOFF, TIME_SLOTS
+)
+
+
+def parse_csv_data(csv_data) -> Dict:
+    """Parse a stored CSV row (JSON, or the Python repr older imports saved)."""
+    if isinstance(csv_data, dict):
+        return csv_data
+    if not csv_data:
+        return {}
+    try:
+        parsed = json.loads(csv_data)
+    except (ValueError, TypeError):
+        try:
+            parsed = ast.literal_eval(csv_data)
+        except (ValueError, SyntaxError):
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def section_fields(row: Dict) -> tuple:
+    """Return normalized (course, year_level, section) from a CSV row."""
+    def clean(key):
+        value = row.get(key)
+        value = str(value).strip() if value is not None else ''
+        return value or None
+    return clean('Course'), clean('Year'), clean('Section')
+
+
+def _is_busy_error(error: Exception) -> bool:
+    """Return True if SQLite refused the statement because of a lock."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and (
+        'locked' in message or 'busy' in message
+    )
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by every thread using a Database.
+    
+    Connections are opened lazily up to ``max_size`` and handed back to the
+    pool instead of being closed, so the scanner thread, the sync service and
+    Flask workers all reuse the same handful of connections. A thread that
+    already holds a connection gets the same one back on nested acquisition,
+    which lets helpers call each other inside one transaction.
+    """
+    
+    def __init__(self, db_name: str, max_size: int = DB_POOL_SIZE, pragmas: Dict = None):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.pragmas = pragmas or {}
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.opened = 0
+        self.reused = 0
+    
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection that may be handed between threads."""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self._connections.append(conn)
+            self.opened += 1
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error.
+        
+        Only the outermost borrow in a thread commits or rolls back, matching
+        the behaviour of ``with sqlite3.connect(...)`` for single calls.
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+        
+        self._slots.acquire()
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            try:
+                conn = self._open()
+            except Exception:
+                self._slots.release()
+                raise
+        
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._idle.put(conn)
+            self._slots.release()
+    
+    def holds_connection(self) -> bool:
+        """Return True if the calling thread is already inside a borrow."""
+        return getattr(self._local, 'conn', None) is not None
+    
+    def stats(self) -> Dict:
+        """Return how many connections were opened versus reused."""
+        with self._lock:
+            return {
+                'opened': self.opened,
+                'reused': self.reused,
+                'idle': self._idle.qsize(),
+                'max_size': self.max_size
+            }
+    
+    def close_all(self):
+        """Close every connection the pool has opened."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error closing pooled connection: {e}")
 
 
 class Database:
     """Handles all SQLite interactions for events and attendance."""
     
-    def __init__(self, db_name: str = "mascan_attendance.db"):
+    def __init__(self, db_name: str = "mascan_attendance.db", pool_size: int = DB_POOL_SIZE,
+                 storage_profile: Dict = None):
         self.db_name = db_name
+        self.storage_profile = dict(DB_STORAGE_PROFILE if storage_profile is None else storage_profile)
+        connection_pragmas = {k: v for k, v in self.storage_profile.items() if k != 'journal_mode'}
+        self._pool = ConnectionPool(db_name, pool_size, connection_pragmas)
+        self.roster_cache = RosterCache()
+        self._apply_storage_profile()
         self.create_tables()
         self.create_enhanced_tables()
         self._ensure_admin_role()
     
+    def _connection(self):
+        """Borrow a pooled connection (use as a context manager)."""
+        return self._pool.connection()
+    
+    def get_pool_stats(self) -> Dict:
+        """Get connection pool counters (opened vs reused connections)."""
+        return self._pool.stats()
+    
+    def close(self):
+        """Close all pooled connections."""
+        self._pool.close_all()
+    
+    def _apply_storage_profile(self):
+        """Switch the database file to the configured journal mode (once at startup)."""
+        journal_mode = self.storage_profile.get('journal_mode')
+        if not journal_mode:
+            return
+        try:
+            with self._connection() as conn:
+                mode = conn.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+                print(f"SQLite journal mode: {mode}")
+        except sqlite3.Error as e:
+            print(f"Error applying storage profile: {e}")
+    
+    def _with_busy_retry(self, operation):
+        """Run ``operation`` and retry with jittered backoff while SQLite is busy.
+        
+        Retries only happen at the outermost connection scope; inside a
+        transaction the error is raised so the whole transaction is retried.
+        """
+        delay = DB_BUSY_BACKOFF
+        for attempt in range(DB_BUSY_RETRIES + 1):
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                if (not _is_busy_error(e) or attempt == DB_BUSY_RETRIES
+                        or self._pool.holds_connection()):
+                    raise
+                print(f"Database busy, retrying ({attempt + 1}/{DB_BUSY_RETRIES})")
+                time.sleep(delay * (1 + random.random()))
+                delay *= 2
+    
+    @contextmanager
+    def _transaction(self):
+        """Borrow a connection and hold SQLite's write lock until the block ends."""
+        with self._connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+    
     def _ensure_admin_role(self):
         """Ensure the admin user has the correct role."""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 # Force update admin user's role to 'admin'
                 cursor.execute("UPDATE users SET role = 'admin' WHERE username = 'admin'")
-                conn.commit()
                 print("Ensured admin user has 'admin' role")
         except sqlite3.Error as e:
             print(f"Error ensuring admin role: {e}")
 
     def _execute(self, query: str, params: tuple = (), commit: bool = True, 
                  fetch_all: bool = False, fetch_one: bool = False):
-        """Execute SQL command with proper error handling."""
-        result = None
-        try:
-            with sqlite3.connect(self.db_name) as conn:
+        """Execute SQL command with proper error handling.
+        
+        The statement runs on a pooled connection; changes are committed when
+        the outermost connection scope of the calling thread closes.
+        """
+        def run():
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 
                 if fetch_one:
-                    result = cursor.fetchone()
-                elif fetch_all:
-                    result = cursor.fetchall()
-                
-                if commit:
-                    conn.commit()
-                    
-            return result
+                    return cursor.fetchone()
+                if fetch_all:
+                    return cursor.fetchall()
+                return None
+        
+        try:
+            return self._with_busy_retry(run)
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             # Return empty list for fetch_all, None for fetch_one, to prevent iteration errors
@@ -56,7 +259,7 @@ class Database:
     def _add_column_if_not_exists(self, table: str, column: str, column_type: str):
         """Add a column to a table if it doesn't already exist."""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 # Check if column exists
                 cursor.execute(f"PRAGMA table_info({table})")
@@ -65,7 +268,6 @@ class Database:
                 if column not in columns:
                     print(f"Adding column '{column}' to table '{table}'")
                     cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
-                    conn.commit()
                     print(f"Column '{column}' added successfully")
         except sqlite3.Error as e:
             print(f"Database error adding column: {e}")
@@ -116,7 +318,7 @@ class Database:
         
         # Ensure admin user exists and has correct role
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 # Check if admin exists
@@ -130,7 +332,6 @@ class Database:
                     # Update role to 'admin' if it's not already
                     if current_role != 'admin':
                         cursor.execute("UPDATE users SET role = 'admin' WHERE username = 'admin'")
-                        conn.commit()
                         print("Admin user role updated to 'admin'")
                     else:
                         print("Admin user already has 'admin' role")
@@ -142,7 +343,6 @@ class Database:
                         "INSERT INTO users (username, password, full_name, role, created_at) VALUES (?, ?, ?, ?, ?)",
                         ('admin', hashed_password, 'Administrator', 'admin', datetime.now().isoformat())
                     )
-                    conn.commit()
                     print("Default admin user created")
         except sqlite3.Error as e:
             print(f"Error ensuring admin user: {e}")
@@ -232,18 +432,38 @@ class Database:
             return False
 
     def is_user_checked_in(self, event_id: str, user_id: str) -> Optional[str]:
-        """Check if a user has already checked in for a specific event (any time slot)."""
-        query = "SELECT timestamp FROM attendance WHERE event_id = ? AND user_id = ? LIMIT 1"
+        """Check if a user has checked in for an event in any time slot.
+        
+        Reads attendance_timeslots, where scans are recorded.
+        
+        Returns:
+            'YYYY-MM-DD HH:MM:SS' of the earliest slot marked Present, or None
+        """
+        columns = ', '.join(f"{slot}_status, {slot}_time" for slot in TIME_SLOTS)
+        query = f"SELECT date_recorded, {columns} FROM attendance_timeslots WHERE event_id = ? AND user_id = ?"
         result = self._execute(query, (event_id, user_id), fetch_one=True)
-        return result[0] if result else None
+        if not result:
+            return None
+        for i in range(len(TIME_SLOTS)):
+            status, slot_time = result[1 + 2 * i], result[2 + 2 * i]
+            if status == 'Present':
+                return f"{result[0]} {slot_time}"
+        return None
     
     def is_checked_in_for_slot(self, event_id: str, user_id: str, time_slot: str) -> Optional[str]:
-        """Check if user is already checked in for a specific time slot."""
-        query = """
-        SELECT timestamp FROM attendance 
-        WHERE event_id = ? AND user_id = ? AND time_slot = ?
+        """Check if a user has checked in for one time slot of an event.
+        
+        Returns:
+            'YYYY-MM-DD HH:MM:SS' the slot was marked Present, or None
+        """
+        if time_slot not in TIME_SLOTS:
+            print(f"Invalid time slot: {time_slot}")
+            return None
+        query = f"""
+        SELECT date_recorded || ' ' || {time_slot}_time FROM attendance_timeslots 
+        WHERE event_id = ? AND user_id = ? AND {time_slot}_status = 'Present'
         """
-        result = self._execute(query, (event_id, user_id, time_slot), fetch_one=True)
+        result = self._execute(query, (event_id, user_id), fetch_one=True)
         return result[0] if result else None
 
     def get_attendance_by_event(self, event_id: str) -> Dict:
@@ -271,50 +491,13 @@ class Database:
         return attendance_log
     
     def get_attendance_summary(self, event_id: str) -> Dict:
-        """Get attendance summary by time slot using new database structure."""
+        """Get Present counts per time slot from the maintained summary counters."""
         try:
-            # Get attendance by section which has the new timeslot structure
-            attendance_by_section = self.get_attendance_by_section(event_id)
-            
-            morning_count = 0
-            afternoon_count = 0
-            
-            # Count Present status for each time slot
-            for section_name, students in attendance_by_section.items():
-                for student in students:
-                    if student.get('morning_status') == 'Present':
-                        morning_count += 1
-                    if student.get('afternoon_status') == 'Present':
-                        afternoon_count += 1
-            
-            return {
-                'morning': morning_count,
-                'afternoon': afternoon_count
-            }
-        except Exception as e:
+            with self._connection() as conn:
+                return self._count_present(conn, event_id)
+        except sqlite3.Error as e:
             print(f"Error getting attendance summary: {e}")
-            
-            # Fallback to old attendance table if new structure fails
-            try:
-                query = """
-                SELECT time_slot, COUNT(DISTINCT user_id) as count
-                FROM attendance
-                WHERE event_id = ?
-                GROUP BY time_slot
-                """
-                results = self._execute(query, (event_id,), fetch_all=True)
-                
-                summary = {'morning': 0, 'afternoon': 0}
-                if results:
-                    for row in results:
-                        time_slot, count = row
-                        if time_slot in summary:
-                            summary[time_slot] = count
-                
-                return summary
-            except Exception as fallback_error:
-                print(f"Fallback error: {fallback_error}")
-                return {'morning': 0, 'afternoon': 0}
+            return {slot: 0 for slot in TIME_SLOTS}
 
     # Password hashing methods
     def hash_password(self, password: str) -> str:
@@ -352,13 +535,11 @@ class Database:
         """Get all users from database."""
         try:
             query = "SELECT username, full_name, role FROM users ORDER BY username"
-            with sqlite3.connect(self.db_name) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query)
-                results = cursor.fetchall()
                 # Return as list of tuples for consistency
-                return [(row['username'], row['full_name'], row['role']) for row in results]
+                return [tuple(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             print(f"Database error getting users: {e}")
             return []
@@ -375,10 +556,9 @@ class Database:
             # Hash the password before storing
             hashed_password = self.hash_password(password)
             query = "INSERT INTO users (username, password, full_name, role, created_at) VALUES (?, ?, ?, ?, ?)"
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, (username, hashed_password, full_name, role, datetime.now().isoformat()))
-                conn.commit()
                 return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"Database error creating user: {e}")
@@ -386,6 +566,56 @@ class Database:
     
     # database/db_manager.py (Add these methods)
 
+    def _run_migration(self, name: str, migration) -> bool:
+        """Run ``migration(conn)`` once per database, recording it in schema_migrations."""
+        try:
+            with self._transaction() as conn:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name TEXT PRIMARY KEY,
+                    applied_at TEXT NOT NULL
+                )
+                """)
+                if conn.execute("SELECT 1 FROM schema_migrations WHERE name = ?", (name,)).fetchone():
+                    return False
+                migration(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (name, applied_at) VALUES (?, ?)",
+                    (name, datetime.now().isoformat())
+                )
+                print(f"Applied migration '{name}'")
+                return True
+        except sqlite3.Error as e:
+            print(f"Error applying migration '{name}': {e}")
+            return False
+    
+    def _backfill_student_sections(self, conn):
+        """Fill course/year_level/section from csv_data and store csv_data as JSON."""
+        rows = conn.execute("SELECT id, csv_data FROM students_qrcodes WHERE csv_data IS NOT NULL").fetchall()
+        updates = []
+        for row_id, csv_data in rows:
+            row = parse_csv_data(csv_data)
+            course, year_level, section = section_fields(row)
+            updates.append((course, year_level, section, json.dumps(row) if row else csv_data, row_id))
+        conn.executemany("""
+            UPDATE students_qrcodes
+            SET course = ?, year_level = COALESCE(?, year_level), section = COALESCE(?, section), csv_data = ?
+            WHERE id = ?
+            """, updates)
+    
+    def _drop_stored_qr_images(self, conn):
+        """Blank stored base64 QR images; they are regenerated from qr_data when needed."""
+        cursor = conn.execute("UPDATE students_qrcodes SET qr_data_encoded = '' WHERE qr_data_encoded != ''")
+        self._dropped_qr_images = cursor.rowcount
+    
+    def _vacuum(self):
+        """Rebuild the database file to return freed pages to the filesystem."""
+        try:
+            with self._connection() as conn:
+                conn.execute("VACUUM")
+        except sqlite3.Error as e:
+            print(f"Error vacuuming database: {e}")
+    
     def create_enhanced_tables(self):
         """Create enhanced tables for time-slot attendance tracking."""
         
@@ -423,10 +653,11 @@ class Database:
             last_name TEXT,
             first_name TEXT,
             middle_initial TEXT,
+            course TEXT,
             year_level TEXT,
             section TEXT,
             qr_data TEXT NOT NULL UNIQUE,
-            qr_data_encoded TEXT NOT NULL,
+            qr_data_encoded TEXT NOT NULL DEFAULT '',
             csv_data TEXT,
             created_at TEXT NOT NULL
         )
@@ -462,6 +693,7 @@ class Database:
         self._add_column_if_not_exists('students_qrcodes', 'last_name', 'TEXT')
         self._add_column_if_not_exists('students_qrcodes', 'first_name', 'TEXT')
         self._add_column_if_not_exists('students_qrcodes', 'middle_initial', 'TEXT')
+        self._add_column_if_not_exists('students_qrcodes', 'course', 'TEXT')
         self._add_column_if_not_exists('attendance_timeslots', 'morning_time', 'TEXT')
         self._add_column_if_not_exists('attendance_timeslots', 'morning_status', "TEXT DEFAULT 'Absent'")
         self._add_column_if_not_exists('attendance_timeslots', 'lunch_time', 'TEXT')
@@ -472,62 +704,285 @@ class Database:
         # Create indexes for better performance
         self._execute("CREATE INDEX IF NOT EXISTS idx_students_section ON students_qrcodes(year_level, section)")
         self._execute("CREATE INDEX IF NOT EXISTS idx_attendance_event ON attendance_timeslots(event_id)")
+        self._execute("""
+        CREATE INDEX IF NOT EXISTS idx_students_course_section
+        ON students_qrcodes(course, year_level, section, name)
+        """)
+        self._run_migration('backfill_student_sections', self._backfill_student_sections)
+        if self._run_migration('drop_stored_qr_images', self._drop_stored_qr_images) and self._dropped_qr_images:
+            # Only an existing roster with stored images has pages worth returning
+            self._vacuum()
+        
+        self._create_attendance_summary()
+        
+        # Roster version, bumped by triggers on every roster change (used by roster caches)
+        self._execute("""
+        CREATE TABLE IF NOT EXISTS roster_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self._execute("INSERT OR IGNORE INTO roster_meta (id, version) VALUES (1, 0)")
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            self._execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_roster_version_{operation.lower()}
+            AFTER {operation} ON students_qrcodes
+            BEGIN
+                UPDATE roster_meta SET version = version + 1 WHERE id = 1;
+            END
+            """)
 
-    def record_timeslot_attendance(self, event_id: str, school_id: str, time_slot: str) -> bool:
-        """Record attendance for a specific time slot."""
-        from datetime import datetime
+    def _create_attendance_summary(self):
+        """Create the per-event, per-slot Present counters and the triggers that maintain them.
+        
+        The counters are updated by triggers inside every write to
+        attendance_timeslots, so reading a summary is a primary-key lookup
+        instead of a scan over the roster. Existing attendance is counted
+        once when the table is first created.
+        """
+        insert_body, update_body, delete_body = [], [], []
+        for slot in TIME_SLOTS:
+            bump = """
+                INSERT INTO attendance_summary (event_id, time_slot, present_count)
+                SELECT {row}.event_id, '{slot}', 0
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM attendance_summary
+                    WHERE event_id = {row}.event_id AND time_slot = '{slot}'
+                );
+                UPDATE attendance_summary SET present_count = present_count {sign} 1
+                WHERE event_id = {row}.event_id AND time_slot = '{slot}' AND {row}.{slot}_status = 'Present';
+            """
+            insert_body.append(bump.format(row='NEW', slot=slot, sign='+'))
+            update_body.append(bump.format(row='OLD', slot=slot, sign='-'))
+            update_body.append(bump.format(row='NEW', slot=slot, sign='+'))
+            delete_body.append(bump.format(row='OLD', slot=slot, sign='-'))
         
-        time_now = datetime.now().strftime("%H:%M:%S")
-        date_now = datetime.now().strftime("%Y-%m-%d")
+        try:
+            with self._transaction() as conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_summary'"
+                ).fetchone()
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS attendance_summary (
+                    event_id TEXT NOT NULL,
+                    time_slot TEXT NOT NULL,
+                    present_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (event_id, time_slot)
+                )
+                """)
+                for name, event, body in (
+                    ('insert', 'INSERT', insert_body),
+                    ('update', 'UPDATE', update_body),
+                    ('delete', 'DELETE', delete_body),
+                ):
+                    conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_{name}
+                    AFTER {event} ON attendance_timeslots
+                    BEGIN
+                        {''.join(body)}
+                    END
+                    """)
+                
+                if not exists:
+                    # One-time backfill from existing attendance
+                    for slot in TIME_SLOTS:
+                        conn.execute(f"""
+                        INSERT INTO attendance_summary (event_id, time_slot, present_count)
+                        SELECT event_id, '{slot}', SUM({slot}_status = 'Present')
+                        FROM attendance_timeslots
+                        GROUP BY event_id
+                        """)
+                    print("Attendance summary counters created")
+        except sqlite3.Error as e:
+            print(f"Error creating attendance summary: {e}")
+    
+    def record_timeslot_attendance(self, event_id: str, school_id: str, time_slot: str) -> Dict:
+        """Record attendance for a specific time slot.
         
-        # Check if record exists
-        check_query = "SELECT id FROM attendance_timeslots WHERE event_id = ? AND user_id = ?"
-        existing = self._execute(check_query, (event_id, school_id), fetch_one=True)
+        Runs a single INSERT ... ON CONFLICT DO UPDATE, so checking for an
+        existing row and marking the slot happen atomically.
         
-        if existing:
-            # Update existing record
-            if time_slot == 'morning':
-                update_query = """
-                UPDATE attendance_timeslots 
-                SET morning_time = ?, morning_status = 'Present'
-                WHERE event_id = ? AND user_id = ?
-                """
-            elif time_slot == 'lunch':
-                update_query = """
-                UPDATE attendance_timeslots 
-                SET lunch_time = ?, lunch_status = 'Present'
-                WHERE event_id = ? AND user_id = ?
-                """
-            else:  # afternoon
-                update_query = """
-                UPDATE attendance_timeslots 
-                SET afternoon_time = ?, afternoon_status = 'Present'
-                WHERE event_id = ? AND user_id = ?
-                """
-            
-            self._execute(update_query, (time_now, event_id, school_id))
-        else:
-            # Create new record
-            insert_query = """
-            INSERT INTO attendance_timeslots 
-            (event_id, user_id, {}_time, {}_status, date_recorded)
-            VALUES (?, ?, ?, 'Present', ?)
-            """.format(time_slot, time_slot)
-            
-            self._execute(insert_query, (event_id, school_id, time_now, date_now))
+        Returns:
+            Dict with 'success' and 'already_present' (True if the slot was
+            already marked Present; the original check-in time is kept).
+        """
+        if time_slot not in TIME_SLOTS:
+            print(f"Invalid time slot: {time_slot}")
+            return {'success': False, 'already_present': False}
         
-        return True
+        def run():
+            with self._connection() as conn:
+                return self._upsert_timeslot(conn, event_id, school_id, time_slot)
+        
+        try:
+            marked = self._with_busy_retry(run)
+            return {'success': True, 'already_present': not marked}
+        except sqlite3.Error as e:
+            print(f"Error recording timeslot attendance: {e}")
+            return {'success': False, 'already_present': False}
+    
+    def bulk_record_timeslot_attendance(self, event_id: str, school_ids: List[str], time_slot: str,
+                                        scanned_at: Optional[Dict[str, datetime]] = None) -> Dict:
+        """Mark many students Present for one time slot in a single transaction.
+        
+        IDs that are not on the roster are skipped.
+        
+        Args:
+            event_id: Event to record attendance for
+            school_ids: Scanned school IDs (duplicates are counted once)
+            time_slot: Time slot to mark Present
+            scanned_at: When each ID was actually scanned; IDs missing from it
+                are recorded with the current time
+        
+        Returns:
+            Dict with 'recorded', 'already_present' and 'not_found' counts.
+        """
+        counts = {'recorded': 0, 'already_present': 0, 'not_found': 0}
+        scanned_at = scanned_at or {}
+        if time_slot not in TIME_SLOTS:
+            print(f"Invalid time slot: {time_slot}")
+            counts['not_found'] = len(school_ids)
+            return counts
+        
+        def run():
+            result = dict.fromkeys(counts, 0)
+            with self._transaction() as conn:
+                known = set()
+                unique_ids = list(dict.fromkeys(school_ids))
+                for i in range(0, len(unique_ids), 500):
+                    chunk = unique_ids[i:i + 500]
+                    placeholders = ', '.join('?' * len(chunk))
+                    known.update(r[0] for r in conn.execute(
+                        f"SELECT school_id FROM students_qrcodes WHERE school_id IN ({placeholders})", chunk
+                    ))
+                for school_id in unique_ids:
+                    if school_id not in known:
+                        result['not_found'] += 1
+                    elif self._upsert_timeslot(conn, event_id, school_id, time_slot, scanned_at.get(school_id)):
+                        result['recorded'] += 1
+                    else:
+                        result['already_present'] += 1
+            return result
+        
+        try:
+            return self._with_busy_retry(run)
+        except sqlite3.Error as e:
+            print(f"Error bulk recording timeslot attendance: {e}")
+            return counts
+    
+    def _upsert_timeslot(self, conn, event_id: str, school_id: str, time_slot: str,
+                         recorded_at: Optional[datetime] = None) -> Optional[str]:
+        """Mark a slot Present on ``conn`` at ``recorded_at`` (default now); returns the recorded time, or None if it already was."""
+        now = recorded_at or datetime.now()
+        recorded_time = now.strftime("%H:%M:%S")
+        query = f"""
+        INSERT INTO attendance_timeslots 
+        (event_id, user_id, {time_slot}_time, {time_slot}_status, date_recorded)
+        VALUES (?, ?, ?, 'Present', ?)
+        ON CONFLICT(event_id, user_id) DO UPDATE
+        SET {time_slot}_time = excluded.{time_slot}_time, {time_slot}_status = 'Present'
+        WHERE {time_slot}_status IS NOT 'Present'
+        """
+        cursor = conn.execute(query, (event_id, school_id, recorded_time, now.strftime("%Y-%m-%d")))
+        return recorded_time if cursor.rowcount > 0 else None
+    
+    def _count_present(self, conn, event_id: str) -> Dict:
+        """Read the maintained per-slot Present counters for an event on ``conn``."""
+        summary = {slot: 0 for slot in TIME_SLOTS}
+        rows = conn.execute(
+            "SELECT time_slot, present_count FROM attendance_summary WHERE event_id = ?",
+            (event_id,)
+        ).fetchall()
+        for time_slot, count in rows:
+            summary[time_slot] = count
+        return summary
+    
+    def process_scan(self, event_id: str, qr_payload: str, time_slot: str,
+                     scanner: Optional[str] = None) -> Dict:
+        """Handle one scan in a single transaction.
+        
+        Looks up the event and student, marks the time slot, writes the
+        scan history entry and reads back the per-slot counters.
+        
+        Args:
+            event_id: Event being scanned for
+            qr_payload: Raw QR text (format: school_id|name) or a typed ID
+            time_slot: One of TIME_SLOTS
+            scanner: Username of the scanning user (recorded in scan history)
+        
+        Returns:
+            Dict with 'status' ('recorded', 'duplicate', 'student_not_found',
+            'invalid_qr', 'event_not_found', 'past_event' or 'error'),
+            'student' (dict or None), 'time_slot', 'summary' (per-slot counts)
+            and 'recorded_time' (HH:MM:SS when status is 'recorded').
+        """
+        result = {'status': 'error', 'student': None, 'time_slot': time_slot, 'summary': {}, 'recorded_time': None}
+        
+        school_id = (qr_payload or '').split('|')[0].strip()
+        if not school_id:
+            result['status'] = 'invalid_qr'
+            return result
+        if time_slot not in TIME_SLOTS:
+            print(f"Invalid time slot: {time_slot}")
+            return result
+        
+        cached, cached_student = self._lookup_roster(school_id)
+        
+        def run():
+            student = cached_student
+            with self._transaction() as conn:
+                event = conn.execute("SELECT date FROM events WHERE id = ?", (event_id,)).fetchone()
+                if not event:
+                    return 'event_not_found', None, {}, None
+                try:
+                    if datetime.strptime(event[0], '%Y-%m-%d').date() < datetime.now().date():
+                        return 'past_event', None, {}, None
+                except (ValueError, TypeError):
+                    pass  # Legacy dates: allow scanning
+                
+                if not cached:
+                    row = conn.execute(
+                        "SELECT school_id, name, year_level, section FROM students_qrcodes WHERE school_id = ?",
+                        (school_id,)
+                    ).fetchone()
+                    student = {
+                        'school_id': row[0],
+                        'name': row[1],
+                        'year_level': row[2],
+                        'section': row[3]
+                    } if row else None
+                if not student:
+                    return 'student_not_found', None, {}, None
+                
+                recorded_time = self._upsert_timeslot(conn, event_id, school_id, time_slot)
+                if not recorded_time:
+                    return 'duplicate', student, self._count_present(conn, event_id), None
+                
+                if scanner:
+                    conn.execute("""
+                        INSERT INTO scan_history 
+                        (scanner_username, scanned_user_id, scanned_user_name, event_id, scan_time) 
+                        VALUES (?, ?, ?, ?, ?)
+                        """, (scanner, school_id, student['name'], event_id, datetime.now().isoformat()))
+                return 'recorded', student, self._count_present(conn, event_id), recorded_time
+        
+        try:
+            (result['status'], result['student'], result['summary'],
+             result['recorded_time']) = self._with_busy_retry(run)
+        except sqlite3.Error as e:
+            print(f"Error processing scan: {e}")
+        return result
 
     def get_attendance_by_section(self, event_id: str) -> dict:
-        """Get attendance grouped by year and section."""
+        """Get attendance grouped by course, year and section (in idx_students_course_section order)."""
         query = """
         SELECT 
             s.school_id,
             s.name,
             
-            COALESCE(json_extract(s.csv_data, '$.Course'), 'N/A') AS course,
-            COALESCE(json_extract(s.csv_data, '$.Year'), 'N/A') AS year_level,
-            COALESCE(json_extract(s.csv_data, '$.Section'), 'N/A') AS section,
+            COALESCE(s.course, 'N/A') AS course,
+            COALESCE(s.year_level, 'N/A') AS year_level,
+            COALESCE(s.section, 'N/A') AS section,
 
             COALESCE(a.morning_time, '') AS morning_time,
             COALESCE(a.morning_status, 'Absent') AS morning_status,
@@ -540,11 +995,7 @@ class Database:
         LEFT JOIN attendance_timeslots a 
             ON s.school_id = a.user_id AND a.event_id = ?
 
-        ORDER BY 
-            json_extract(s.csv_data, '$.Course'),
-            json_extract(s.csv_data, '$.Year'),
-            json_extract(s.csv_data, '$.Section'),
-            s.name;
+        ORDER BY s.course, s.year_level, s.section, s.name;
         """
         
         results = self._execute(query, (event_id,), fetch_all=True)
@@ -586,9 +1037,39 @@ class Database:
         result = self._execute(query, (event_id, school_id), fetch_one=True)
         
         return result and result[0] == 'Present'
-
+    
+    def get_recent_timeslot_scans(self, event_id: str, time_slot: str, limit: int = 15) -> list:
+        """Get the latest check-ins for one event and time slot, newest first.
+        
+        Reads only the event's attendance rows (not the whole roster report),
+        so it is cheap enough to call after every scan.
+        
+        Returns:
+            List of dicts with 'school_id', 'name', 'time' and 'time_slot'
+        """
+        if time_slot not in TIME_SLOTS:
+            print(f"Invalid time slot: {time_slot}")
+            return []
+        query = f"""
+        SELECT a.user_id, COALESCE(s.name, a.user_id), a.{time_slot}_time
+        FROM attendance_timeslots a
+        LEFT JOIN students_qrcodes s ON s.school_id = a.user_id
+        WHERE a.event_id = ? AND a.{time_slot}_status = 'Present'
+        ORDER BY a.{time_slot}_time DESC
+        LIMIT ?
+        """
+        results = self._execute(query, (event_id, limit), fetch_all=True)
+        return [
+            {'school_id': school_id, 'name': name, 'time': scan_time, 'time_slot': time_slot}
+            for school_id, name, scan_time in results or []
+        ]
+    
     def get_student_by_id(self, school_id: str) -> dict:
-        """Get student information by school ID."""
+        """Get student information by school ID (served from the roster cache when warm)."""
+        answered, student = self._lookup_roster(school_id)
+        if answered:
+            return student
+        
         query = "SELECT school_id, name, year_level, section FROM students_qrcodes WHERE school_id = ?"
         result = self._execute(query, (school_id,), fetch_one=True)
         
@@ -601,33 +1082,187 @@ class Database:
             }
         return None
     
-    def create_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
-        """Create a new student with QR code."""
+    # Roster cache
+    def get_roster_version(self) -> Optional[int]:
+        """Get the roster version (incremented on every students_qrcodes change)."""
+        result = self._execute("SELECT version FROM roster_meta WHERE id = 1", fetch_one=True)
+        return result[0] if result else None
+    
+    def warm_roster_cache(self) -> bool:
+        """Load the whole roster into the in-memory roster cache."""
+        try:
+            with self._connection() as conn:
+                version = conn.execute("SELECT version FROM roster_meta WHERE id = 1").fetchone()
+                rows = conn.execute(
+                    "SELECT school_id, name, year_level, section FROM students_qrcodes"
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error warming roster cache: {e}")
+            return False
+        
+        students = [
+            {
+                'school_id': school_id,
+                'name': name,
+                'year_level': year_level,
+                'section': section
+            }
+            for school_id, name, year_level, section in rows
+        ]
+        self.roster_cache.load(students, version[0] if version else 0)
+        print(f"Roster cache warmed with {len(students)} student(s)")
+        return True
+    
+    def get_roster_cache_stats(self) -> Dict:
+        """Get roster cache hit/miss counters."""
+        return self.roster_cache.stats()
+    
+    def _lookup_roster(self, school_id: str):
+        """Answer a student lookup from the roster cache, reloading it if the roster changed."""
+        if self.roster_cache.needs_check():
+            if not self.roster_cache.mark_checked(self.get_roster_version()):
+                self.warm_roster_cache()
+        return self.roster_cache.lookup(school_id)
+    
+    def create_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str = None, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
+        """Create a new student with QR code (course/year/section are taken from csv_data).
+        
+        ``qr_data_encoded`` is accepted for compatibility but not stored; QR images
+        are regenerated from qr_data when needed.
+        """
         try:
+            csv_data, course, year_level, section = self._normalize_csv_data(csv_data)
             query = """
             INSERT INTO students_qrcodes 
-            (school_id, name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (school_id, name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial,
+             course, year_level, section, created_at)
+            VALUES (?, ?, ?, '', ?, ?, ?, ?, ?, ?, ?, ?)
             """
-            self._execute(query, (school_id, name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial, datetime.now().isoformat()))
+            self._execute(query, (school_id, name, qr_data, csv_data, last_name, first_name, middle_initial,
+                                  course, year_level, section, datetime.now().isoformat()))
+            self.roster_cache.invalidate()
             return True
         except sqlite3.Error as e:
             print(f"Error creating student: {e}")
             return False
     
-    def update_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
-        """Update an existing student."""
+    def update_student(self, school_id: str, name: str, qr_data: str, qr_data_encoded: str = None, csv_data: str = None, last_name: str = None, first_name: str = None, middle_initial: str = None) -> bool:
+        """Update an existing student (course/year/section are taken from csv_data).
+        
+        ``qr_data_encoded`` is accepted for compatibility but not stored; QR images
+        are regenerated from qr_data when needed.
+        """
         try:
+            csv_data, course, year_level, section = self._normalize_csv_data(csv_data)
             query = """
             UPDATE students_qrcodes 
-            SET name = ?, qr_data = ?, qr_data_encoded = ?, csv_data = ?, last_name = ?, first_name = ?, middle_initial = ?
+            SET name = ?, qr_data = ?, qr_data_encoded = '', csv_data = ?, last_name = ?, first_name = ?, middle_initial = ?,
+                course = ?, year_level = ?, section = ?
             WHERE school_id = ?
             """
-            self._execute(query, (name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial, school_id))
+            self._execute(query, (name, qr_data, csv_data, last_name, first_name, middle_initial,
+                                  course, year_level, section, school_id))
+            self.roster_cache.invalidate()
             return True
         except sqlite3.Error as e:
             print(f"Error updating student: {e}")
             return False
+    
+    def bulk_upsert_students(self, rows: List[Dict]) -> Dict:
+        """Insert or update many students in one transaction.
+        
+        Args:
+            rows: Dicts with school_id, name, qr_data and optional csv_data,
+                last_name, first_name, middle_initial (qr_data_encoded is ignored)
+        
+        Returns:
+            Dict with 'inserted', 'updated' and 'failed' counts.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'failed': 0}
+        now = datetime.now().isoformat()
+        params = []
+        for row in rows:
+            if not all(row.get(field) for field in ('school_id', 'name', 'qr_data')):
+                counts['failed'] += 1
+                continue
+            csv_data, course, year_level, section = self._normalize_csv_data(row.get('csv_data'))
+            params.append((
+                row['school_id'], row['name'], row['qr_data'],
+                csv_data, row.get('last_name'), row.get('first_name'), row.get('middle_initial'),
+                course, year_level, section, now
+            ))
+        if not params:
+            return counts
+        
+        query = """
+        INSERT INTO students_qrcodes 
+        (school_id, name, qr_data, qr_data_encoded, csv_data, last_name, first_name, middle_initial,
+         course, year_level, section, created_at)
+        VALUES (?, ?, ?, '', ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(school_id) DO UPDATE SET
+            name = excluded.name, qr_data = excluded.qr_data, qr_data_encoded = '',
+            csv_data = excluded.csv_data, last_name = excluded.last_name, first_name = excluded.first_name,
+            middle_initial = excluded.middle_initial, course = excluded.course,
+            year_level = excluded.year_level, section = excluded.section
+        """
+        
+        def run():
+            result = {'inserted': 0, 'updated': 0, 'failed': 0}
+            with self._transaction() as conn:
+                # Which IDs already exist decides inserted vs updated
+                existing = set()
+                school_ids = list({p[0] for p in params})
+                for i in range(0, len(school_ids), 500):
+                    chunk = school_ids[i:i + 500]
+                    placeholders = ', '.join('?' * len(chunk))
+                    existing.update(r[0] for r in conn.execute(
+                        f"SELECT school_id FROM students_qrcodes WHERE school_id IN ({placeholders})", chunk
+                    ))
+                
+                conn.execute("SAVEPOINT bulk_students")
+                try:
+                    conn.executemany(query, params)
+                    conn.execute("RELEASE bulk_students")
+                    saved = params
+                except sqlite3.IntegrityError as e:
+                    # A row conflicts (e.g. duplicate qr_data); redo row by row and skip the bad ones
+                    print(f"Bulk import conflict, retrying row by row: {e}")
+                    conn.execute("ROLLBACK TO bulk_students")
+                    conn.execute("RELEASE bulk_students")
+                    saved = []
+                    for row_params in params:
+                        try:
+                            conn.execute(query, row_params)
+                            saved.append(row_params)
+                        except sqlite3.IntegrityError as row_error:
+                            print(f"Error saving student {row_params[0]}: {row_error}")
+                            result['failed'] += 1
+                
+                for row_params in saved:
+                    if row_params[0] in existing:
+                        result['updated'] += 1
+                    else:
+                        result['inserted'] += 1
+                        existing.add(row_params[0])
+            return result
+        
+        try:
+            result = self._with_busy_retry(run)
+        except sqlite3.Error as e:
+            print(f"Error bulk importing students: {e}")
+            result = {'inserted': 0, 'updated': 0, 'failed': len(params)}
+        self.roster_cache.invalidate()
+        
+        for key in counts:
+            counts[key] += result[key]
+        return counts
+    
+    def _normalize_csv_data(self, csv_data) -> tuple:
+        """Return (csv_data as JSON, course, year_level, section) for a roster row."""
+        row = parse_csv_data(csv_data)
+        if not row:
+            return csv_data, None, None, None
+        return (json.dumps(row),) + section_fields(row)
 
     # Login and Activity Tracking Methods
     def record_login(self, username: str) -> bool:
@@ -643,7 +1278,7 @@ class Database:
     def record_logout(self, username: str) -> bool:
         """Record a user logout (updates the most recent login)."""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 # First, find the most recent login with no logout
                 cursor.execute(
@@ -663,7 +1298,6 @@ class Database:
                            WHERE id = ?""",
                         (datetime.now().isoformat(), login_id)
                     )
-                    conn.commit()
                     return True
             return False
         except sqlite3.Error as e:
@@ -0,0 +1,89 @@
+# database/roster_cache.py
+"""In-memory student roster cache for the scan hot path."""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config.constants import ROSTER_CACHE_TTL
+
+
+class RosterCache:
+    """Student roster keyed by school_id.
+
+    The cache stays cold (every lookup misses) until ``load`` is called.
+    Once warm, a lookup is answered from memory, including authoritative
+    "not on the roster" answers. The owner re-checks the roster version at
+    most every ``ttl`` seconds and reloads when it changed; ``invalidate``
+    forces that reload on the next lookup.
+    """
+
+    def __init__(self, ttl: float = ROSTER_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, Dict] = {}
+        self.version = None
+        self.warm = False
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def load(self, students: List[Dict], version):
+        """Replace the cached roster with ``students`` at roster ``version``."""
+        by_id = {student['school_id']: student for student in students}
+        with self._lock:
+            self._by_id = by_id
+            self.version = version
+            self.warm = True
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+
+    def invalidate(self):
+        """Force a version check (and reload) before the next answer."""
+        with self._lock:
+            self.version = None
+            self._checked_at = 0.0
+
+    def needs_check(self) -> bool:
+        """Return True if the cache is warm but its version is due for a check."""
+        with self._lock:
+            return self.warm and (
+                self.version is None or time.monotonic() - self._checked_at > self.ttl
+            )
+
+    def mark_checked(self, version) -> bool:
+        """Record a version check; returns True if the cached roster is still current."""
+        with self._lock:
+            if version is not None and version == self.version:
+                self._checked_at = time.monotonic()
+                return True
+            return False
+
+    def lookup(self, school_id: str) -> Tuple[bool, Optional[Dict]]:
+        """Look up a student by school ID.
+
+        Returns:
+            (answered, student): ``answered`` is False when the cache is cold
+            and the caller must query the database instead.
+        """
+        with self._lock:
+            if not self.warm or self.version is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            student = self._by_id.get(school_id)
+            return True, dict(student) if student else None
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and cache size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'warm': self.warm,
+                'version': self.version,
+                'size': len(self._by_id),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'reloads': self.reloads
+            }
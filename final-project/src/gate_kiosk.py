@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Headless gate kiosk: scan attendance from several cameras in one process.
+
+Each --camera is a camera index, video file, image folder or stream URL,
+optionally followed by the time slot it records (defaults to --slot). All cameras share one attendance
+writer, so a single machine can cover a multi-lane entrance.
+
+Usage:
+    python gate_kiosk.py --event <event_id> --camera 0 --camera 1:lunch
+    python gate_kiosk.py --event <event_id> --camera lane3.mp4 --slot afternoon
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.constants import DATABASE_NAME, TIME_SLOTS
+from database.db_manager import Database
+from api_db_manager import APIDatabase
+from remote_config import API_BASE_URL, API_KEY, USE_REMOTE_DATABASE
+from utils.scanner_manager import ScannerManager
+
+POLL_INTERVAL = 0.5  # seconds between checks for finished sources
+
+
+def parse_camera(spec: str, default_slot: str):
+    """Split 'SOURCE[:SLOT]' into (source, slot); numeric sources are camera indices."""
+    source, separator, slot = spec.rpartition(':')
+    if not separator or slot not in TIME_SLOTS:
+        source, slot = spec, default_slot
+    return (int(source) if source.isdigit() else source), slot
+
+
+def print_result(camera: str, result: dict):
+    """Log one recorded scan."""
+    student = result.get('student') or {}
+    print(f"[{camera}] {result['status']}: {student.get('name', '-')} ({result['time_slot']})")
+
+
+def report_stats(manager: ScannerManager):
+    """Print per-camera FPS and decode latency, writer throughput and API latency."""
+    stats = manager.get_stats()
+    for name, camera in stats['cameras'].items():
+        print(f"  {name} ({camera['source']}, {camera['time_slot']}): "
+              f"{camera['capture_fps']:.1f} fps, {camera['frames_decoded']} decoded, "
+              f"{camera['decode_ms']:.1f} ms/decode, {camera['scans']} scans")
+    writer = stats['writer']
+    print(f"  writer: {writer['writes']} writes, {writer['write_ms']:.1f} ms/write, "
+          f"{writer['pending']} pending, {writer['statuses']}")
+    if isinstance(manager.db, APIDatabase):
+        for endpoint, calls in manager.db.get_request_stats().items():
+            print(f"  {endpoint}: {calls['count']} calls, p50 <={calls['p50_ms']:.0f} ms, "
+                  f"p95 <={calls['p95_ms']:.0f} ms, max {calls['max_ms']:.0f} ms, {calls['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera attendance kiosk")
+    parser.add_argument("--event", required=True, help="Event ID to record attendance for")
+    parser.add_argument("--camera", action="append", required=True,
+                        help="Camera index, video file, image folder or URL, optionally SOURCE:SLOT (repeatable)")
+    parser.add_argument("--slot", default=TIME_SLOTS[0], choices=TIME_SLOTS,
+                        help="Time slot for cameras without an explicit one")
+    parser.add_argument("--scanner", default="kiosk", help="Username recorded in scan history")
+    parser.add_argument("--stats-interval", type=float, default=30, help="Seconds between stats reports")
+    args = parser.parse_args()
+    
+    db = APIDatabase(API_BASE_URL, API_KEY) if USE_REMOTE_DATABASE else Database(DATABASE_NAME)
+    db.warm_roster_cache()
+    
+    manager = ScannerManager(db, args.event, args.scanner, on_result=print_result)
+    for index, spec in enumerate(args.camera, 1):
+        source, slot = parse_camera(spec, args.slot)
+        manager.add_camera(f"gate{index}", source, slot)
+    
+    manager.start()
+    print(f"Scanning with {len(args.camera)} camera(s). Press Ctrl+C to stop.")
+    try:
+        next_report = time.monotonic() + args.stats_interval
+        while manager.cameras_running:
+            time.sleep(POLL_INTERVAL)
+            if time.monotonic() >= next_report:
+                report_stats(manager)
+                next_report += args.stats_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        report_stats(manager)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # src/main.py
+import multiprocessing
 import flet as ft
 from app import MaScanApp
 
@@ -8,4 +9,6 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # QR generation uses a process pool; needed when running as a frozen executable
+    multiprocessing.freeze_support()
     ft.app(target=main, port=8080, view=ft.AppView.WEB_BROWSER)
\ No newline at end of file
@@ -0,0 +1,204 @@
+# utils/frame_sources.py
+"""Frame sources for the QR scanner: cameras, video files, image folders, streams and in-memory frames."""
+
+import os
+import cv2
+from typing import Iterable, Optional
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class FrameSource:
+    """Something the scanner can read BGR frames from.
+    
+    Subclasses implement ``open``, ``read`` and ``release``. ``read`` returns
+    ``(ok, frame)`` like cv2.VideoCapture; ``ok`` is False at the end of a
+    finite source or when a live source fails. ``is_live`` tells the
+    scanner whether running out of frames is an error or just the end.
+    """
+    
+    is_live = False
+    fps: Optional[float] = None
+    
+    def open(self) -> bool:
+        """Open the source; returns False if it cannot be read."""
+        return True
+    
+    def read(self):
+        """Return (ok, frame)."""
+        raise NotImplementedError
+    
+    def release(self):
+        """Free the underlying device or file."""
+    
+    def __str__(self):
+        return self.__class__.__name__
+
+
+class CaptureSource(FrameSource):
+    """Frames from cv2.VideoCapture: a video file or a stream URL."""
+    
+    def __init__(self, target):
+        self.target = target
+        self.capture = None
+    
+    def open(self) -> bool:
+        self.capture = cv2.VideoCapture(self.target)
+        if not self.capture.isOpened():
+            return False
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or None
+        return True
+    
+    def read(self):
+        if self.capture is None:
+            return False, None
+        return self.capture.read()
+    
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+    
+    def __str__(self):
+        return str(self.target)
+
+
+class CameraSource(CaptureSource):
+    """Live camera by device index."""
+    
+    is_live = True
+    
+    def __init__(self, index: int, width: int = 640, height: int = 480, fps: int = 30):
+        super().__init__(index)
+        self.width = width
+        self.height = height
+        self.requested_fps = fps
+    
+    def open(self) -> bool:
+        if not super().open():
+            return False
+        # Set camera properties
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.capture.set(cv2.CAP_PROP_FPS, self.requested_fps)
+        return True
+    
+    def __str__(self):
+        return f"camera {self.target}"
+
+
+class StreamSource(CaptureSource):
+    """Network stream (rtsp://, http:// MJPEG, ...), treated as live."""
+    
+    is_live = True
+
+
+class ImageDirectorySource(FrameSource):
+    """Images from a folder, in file name order."""
+    
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = False):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.files = []
+        self.index = 0
+    
+    def open(self) -> bool:
+        if not os.path.isdir(self.path):
+            return False
+        self.files = [
+            os.path.join(self.path, name)
+            for name in sorted(os.listdir(self.path))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        self.index = 0
+        return bool(self.files)
+    
+    def read(self):
+        # At most one pass over the folder per call, so unreadable files cannot spin forever
+        for _ in range(len(self.files)):
+            if self.index >= len(self.files):
+                if not self.loop:
+                    break
+                self.index = 0
+            path = self.files[self.index]
+            self.index += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                return True, frame
+            print(f"Skipping unreadable image {path}")
+        return False, None
+    
+    def __str__(self):
+        return self.path
+
+
+class GeneratorSource(FrameSource):
+    """In-memory frames from a list or generator (tests, benchmarks, load tests).
+    
+    ``loop`` replays a list forever; a one-shot generator simply ends.
+    """
+    
+    def __init__(self, frames: Iterable, fps: Optional[float] = None, loop: bool = False):
+        self.frames = frames
+        self.fps = fps
+        self.loop = loop
+        self._iterator = None
+    
+    def open(self) -> bool:
+        self._iterator = iter(self.frames)
+        return True
+    
+    def read(self):
+        for _ in range(2):
+            try:
+                return True, next(self._iterator)
+            except StopIteration:
+                if not self.loop:
+                    break
+                # Restart from the top (only lists and other re-iterables can loop)
+                self._iterator = iter(self.frames)
+        return False, None
+
+
+class _CaptureAdapter(FrameSource):
+    """Wrap a VideoCapture-like object (read/isOpened/release)."""
+    
+    def __init__(self, capture):
+        self.capture = capture
+    
+    def open(self) -> bool:
+        return self.capture.isOpened()
+    
+    def read(self):
+        return self.capture.read()
+    
+    def release(self):
+        self.capture.release()
+
+
+def open_frame_source(spec, width: int = 640, height: int = 480, fps: int = 30) -> FrameSource:
+    """Build a frame source from a camera index, path, URL or object.
+    
+    Args:
+        spec: Camera index (int or digit string), image folder, video file,
+            stream URL (contains '://'), FrameSource, VideoCapture-like object
+            or an iterable of frames
+        width, height, fps: Requested format for live cameras
+    
+    Returns:
+        An unopened FrameSource
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec), width, height, fps)
+    if isinstance(spec, str):
+        if '://' in spec:
+            return StreamSource(spec)
+        if os.path.isdir(spec):
+            return ImageDirectorySource(spec)
+        return CaptureSource(spec)
+    if hasattr(spec, 'read') and hasattr(spec, 'isOpened'):
+        return _CaptureAdapter(spec)
+    return GeneratorSource(spec)
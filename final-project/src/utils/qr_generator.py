@@ -0,0 +1,199 @@
+# utils/qr_generator.py
+"""QR code image generation, fanned out to a process pool and streamed back."""
+
+import base64
+import io
+import os
+import threading
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import qrcode
+from config.constants import (
+    QR_BOX_SIZE, QR_BORDER, QR_GENERATOR_WORKERS, QR_GENERATOR_CHUNK_SIZE,
+    QR_THUMBNAIL_BOX_SIZE, QR_THUMBNAIL_CACHE_SIZE
+)
+
+
+def make_qr_image(qr_data: str, box_size: int = QR_BOX_SIZE, border: int = QR_BORDER):
+    """Build the PIL image for a payload with the app's standard QR settings."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
+
+def render_qr_png(qr_data: str, box_size: int = QR_BOX_SIZE) -> bytes:
+    """Render a payload to PNG bytes."""
+    buffer = io.BytesIO()
+    make_qr_image(qr_data, box_size).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_qr_base64(qr_data: str, box_size: int = QR_BOX_SIZE) -> str:
+    """Render a payload to a base64 PNG string (for ft.Image.src_base64)."""
+    return base64.b64encode(render_qr_png(qr_data, box_size)).decode()
+
+
+@lru_cache(maxsize=QR_THUMBNAIL_CACHE_SIZE)
+def render_qr_thumbnail(qr_data: str) -> str:
+    """Render a small base64 PNG for previews; recently shown thumbnails are cached."""
+    return render_qr_base64(qr_data, QR_THUMBNAIL_BOX_SIZE)
+
+
+def _render_chunk(start: int, payloads: List[str], box_size: int) -> List[Tuple[int, str, bytes]]:
+    """Worker task: render a contiguous chunk of payloads."""
+    return [(start + offset, qr_data, render_qr_png(qr_data, box_size))
+            for offset, qr_data in enumerate(payloads)]
+
+
+def _create_executor(workers: int):
+    """Prefer a process pool; fall back to threads where processes are unavailable."""
+    try:
+        return ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError, ImportError) as e:
+        print(f"Process pool unavailable ({e}), generating QR codes on threads")
+        return ThreadPoolExecutor(max_workers=workers)
+
+
+def iter_qr_images(payloads: List[str], box_size: int = QR_BOX_SIZE,
+                   workers: int = QR_GENERATOR_WORKERS,
+                   chunk_size: int = QR_GENERATOR_CHUNK_SIZE,
+                   cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[int, str, bytes]]:
+    """Yield (index, qr_data, png_bytes) for every payload, in input order.
+    
+    Chunks are rendered in parallel, but only a bounded number are in flight
+    at once, so memory stays flat no matter how large the roster is.
+    Setting ``cancel_event`` stops the stream after the current chunk.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = ((start, payloads[start:start + chunk_size]) for start in range(0, len(payloads), chunk_size))
+    max_in_flight = workers * 2
+    
+    executor = _create_executor(workers)
+    pending = deque()
+    
+    def submit(start, chunk):
+        pending.append((start, chunk, executor.submit(_render_chunk, start, chunk, box_size)))
+    
+    def fall_back_to_threads(e):
+        # A worker died (or the frozen app can't spawn processes); rerun
+        # every chunk still in flight on threads instead of aborting
+        nonlocal executor
+        print(f"Process pool broke ({e}), generating the rest of the QR codes on threads")
+        executor.shutdown(wait=False)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        retry = [(start, chunk) for start, chunk, _ in pending]
+        pending.clear()
+        for start, chunk in retry:
+            submit(start, chunk)
+    
+    try:
+        for start, chunk in chunks:
+            try:
+                submit(start, chunk)
+            except BrokenProcessPool as e:
+                pending.append((start, chunk, None))
+                fall_back_to_threads(e)
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                results = pending[0][2].result()
+            except BrokenProcessPool as e:
+                fall_back_to_threads(e)
+                continue
+            pending.popleft()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                try:
+                    submit(*next_chunk)
+                except BrokenProcessPool as e:
+                    pending.append((next_chunk[0], next_chunk[1], None))
+                    fall_back_to_threads(e)
+            yield from results
+    finally:
+        for _, _, future in pending:
+            if future is not None:
+                future.cancel()
+        executor.shutdown(wait=False)
+
+
+class QRBatchGenerator:
+    """Generate QR codes for a roster in the background with progress and cancellation."""
+    
+    def __init__(self, payloads: List[str],
+                 on_result: Optional[Callable[[int, str, bytes], None]] = None,
+                 on_progress: Optional[Callable[[int, int], None]] = None,
+                 on_done: Optional[Callable[[bool], None]] = None,
+                 box_size: int = QR_BOX_SIZE,
+                 workers: int = QR_GENERATOR_WORKERS):
+        """Initialize the generator.
+        
+        Args:
+            payloads: QR payloads to render
+            on_result: Called with (index, qr_data, png_bytes) as each image is ready
+            on_progress: Called with (done, total) after each image
+            on_done: Called with True when finished, False when cancelled or failed
+            box_size: Pixels per QR module
+            workers: Worker processes (0 = one per CPU)
+        """
+        self.payloads = payloads
+        self.on_result = on_result
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.box_size = box_size
+        self.workers = workers
+        self.completed = 0
+        self._cancel = threading.Event()
+        self.thread = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+    
+    def start(self):
+        """Start generating in a background thread."""
+        if not self.is_running:
+            self._cancel.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+    
+    def cancel(self):
+        """Stop after the chunk currently being delivered."""
+        self._cancel.set()
+    
+    def _run(self):
+        total = len(self.payloads)
+        finished = False
+        try:
+            for index, qr_data, png in iter_qr_images(
+                    self.payloads, self.box_size, self.workers, cancel_event=self._cancel):
+                if self._cancel.is_set():
+                    break
+                self.completed += 1
+                if self.on_result:
+                    self.on_result(index, qr_data, png)
+                if self.on_progress:
+                    self.on_progress(self.completed, total)
+            finished = not self._cancel.is_set()
+        except Exception as e:
+            print(f"Error generating QR codes: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            if self.on_done:
+                try:
+                    self.on_done(finished)
+                except Exception as e:
+                    print(f"Error in QR generation callback: {e}")
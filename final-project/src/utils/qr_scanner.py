@@ -7,140 +7,442 @@ import threading
 import time
 import base64
 import numpy as np
+from collections import OrderedDict
+from utils.frame_sources import open_frame_source
+from config.constants import (
+    CAMERA_FPS, SCAN_IDLE_FPS, SCAN_DECODE_SCALE, SCAN_ROI_FRACTION,
+    SCAN_MOTION_THRESHOLD, SCAN_FORCE_DECODE_INTERVAL, SCAN_SETTLE_TIME,
+    PREVIEW_ENABLED, PREVIEW_FPS, PREVIEW_JPEG_QUALITY, PREVIEW_WIDTH, SCAN_COOLDOWN_MAX_ENTRIES
+)
+
+
+class LatestFrameSlot:
+    """Single-slot frame buffer between the capture thread and its consumers.
+    
+    ``put`` overwrites the previous frame, so a slow consumer never builds a
+    backlog: it simply skips to the newest frame. Each frame carries a
+    sequence number so consumers can tell new frames from ones already seen
+    and count how many they dropped.
+    
+    With ``lossless`` (recorded sources, where there is no "live" to keep up
+    with) ``put`` instead waits until the previous frame was taken with
+    ``get(..., take=True)``, so that consumer sees every frame.
+    """
+    
+    def __init__(self, lossless: bool = False):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._taken = 0
+        self.lossless = lossless
+        self.closed = False
+    
+    def put(self, frame):
+        """Publish a new frame, replacing any unread one (or waiting for it to be taken)."""
+        with self._condition:
+            if self.lossless:
+                self._condition.wait_for(lambda: self._taken >= self._seq or self.closed)
+            if self.closed:
+                return
+            self._frame = frame
+            self._seq += 1
+            self._condition.notify_all()
+    
+    def get(self, after_seq: int, timeout: float = 0.5, take: bool = False):
+        """Wait for a frame newer than ``after_seq``.
+        
+        A frame published before ``close`` is still returned, so consumers
+        can drain the slot at the end of a finite source.
+        
+        Returns:
+            Tuple of (seq, frame); frame is None on timeout, or when closed
+            with nothing newer left
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > after_seq or self.closed, timeout)
+            if self._seq <= after_seq:
+                return after_seq, None
+            if take:
+                self._taken = self._seq
+                self._condition.notify_all()
+            return self._seq, self._frame
+    
+    def close(self):
+        """Stop accepting frames and wake everyone up; unread frames can still be drained."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class MotionGate:
+    """Skip decoding while the scene is static.
+    
+    Each frame is compared with the last frame that was decoded, on a tiny
+    thumbnail, so the check costs far less than a decode. Every frame is
+    still decoded for ``settle_time`` seconds after the last motion (a code
+    that was just held up may need a few tries while focus and exposure
+    settle), and a decode is forced every ``force_interval`` seconds after
+    that. ``is_static`` tells the capture loop it can slow down.
+    """
+    
+    def __init__(self, threshold=SCAN_MOTION_THRESHOLD, force_interval=SCAN_FORCE_DECODE_INTERVAL,
+                 settle_time=SCAN_SETTLE_TIME):
+        self.threshold = threshold
+        self.force_interval = force_interval
+        self.settle_time = settle_time
+        self._reference = None
+        self._last_decode = 0.0
+        self._last_motion = 0.0
+        self.is_static = False
+    
+    def should_decode(self, gray, now) -> bool:
+        """Return True if ``gray`` changed enough, the scene is settling, or a forced decode is due."""
+        thumbnail = cv2.resize(gray, (64, 48), interpolation=cv2.INTER_AREA)
+        changed = (self._reference is None or
+                   cv2.absdiff(thumbnail, self._reference).mean() > self.threshold)
+        if changed:
+            self._last_motion = now
+        self.is_static = now - self._last_motion >= self.settle_time
+        if not self.is_static or now - self._last_decode >= self.force_interval:
+            self._reference = thumbnail
+            self._last_decode = now
+            return True
+        return False
+
+
+class ScanCooldown:
+    """Suppress repeat reports of the same payload within ``cooldown`` seconds.
+    
+    Every payload has its own cooldown, so several students holding codes
+    in the same frame are each reported once instead of alternating and
+    resetting a single "last scanned" entry. The table is ordered by report
+    time, expired entries are pruned from the front, and at most
+    ``max_entries`` identities are remembered.
+    
+    Shared by the live scanner and offline batch decoding so both count a
+    student held in front of the camera the same way.
+    """
+    
+    def __init__(self, cooldown: float, max_entries: int = SCAN_COOLDOWN_MAX_ENTRIES):
+        self.cooldown = cooldown
+        self.max_entries = max_entries
+        self._seen = OrderedDict()  # qr_data -> time it was last reported
+        self._lock = threading.Lock()
+        self.suppressed = 0
+    
+    def allow(self, qr_data: str, now: float) -> bool:
+        """Return True (and start a new cooldown) if ``qr_data`` should be reported."""
+        with self._lock:
+            # Oldest reports are at the front; drop the ones whose cooldown is over
+            while self._seen:
+                oldest, reported_at = next(iter(self._seen.items()))
+                if now - reported_at <= self.cooldown:
+                    break
+                del self._seen[oldest]
+            
+            if qr_data in self._seen:
+                self.suppressed += 1
+                return False
+            
+            self._seen[qr_data] = now
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return True
+    
+    def __len__(self):
+        return len(self._seen)
 
 
 class QRCameraScanner:
-    """Handle camera operations and QR code detection using OpenCV."""
+    """Handle camera operations and QR code detection using OpenCV.
+    
+    Capture, decoding and preview encoding run on separate threads joined by
+    a LatestFrameSlot, so a slow UI never delays QR detection. While the
+    motion gate reports a static scene, a live camera drops to
+    ``SCAN_IDLE_FPS``. Recorded sources (files, folders, replays) are decoded
+    frame by frame, and ``is_running`` stays True until the last one is.
+    """
     
-    def __init__(self, on_qr_detected, on_frame_update, 
-                 width=640, height=480, cooldown=2):
+    def __init__(self, on_qr_detected, on_frame_update,
+                 width=640, height=480, cooldown=2, source=0,
+                 fps=CAMERA_FPS, decode_scale=SCAN_DECODE_SCALE, roi_fraction=SCAN_ROI_FRACTION,
+                 preview_enabled=PREVIEW_ENABLED, preview_fps=PREVIEW_FPS,
+                 jpeg_quality=PREVIEW_JPEG_QUALITY, preview_width=PREVIEW_WIDTH):
         self.on_qr_detected = on_qr_detected
         self.on_frame_update = on_frame_update
+        self.source = source  # anything open_frame_source accepts (camera index, file, folder, URL, frames)
         self.camera = None
         self.is_running = False
         self.thread = None
-        self.last_scanned = None
-        self.scan_cooldown = cooldown
+        self.workers = []
+        self.scan_cooldown = ScanCooldown(cooldown)
         self.current_frame_base64 = None
         self.width = width
         self.height = height
+        self.fps = fps
+        self.decode_scale = decode_scale
+        self.roi_fraction = roi_fraction
+        self.preview_enabled = preview_enabled and on_frame_update is not None
+        self.preview_fps = preview_fps
+        self.jpeg_quality = jpeg_quality
+        self.preview_width = preview_width
+        self.motion_gate = MotionGate()
+        self.frames = None
+        self.outlines = []
+        self.frames_captured = 0
+        self.frames_decoded = 0
+        self.frames_gated = 0
+        self.frames_dropped = 0
+        self.frames_previewed = 0
+        self.preview_bytes = 0
+        self.decode_seconds = 0.0
+        self.started_at = None
+        self.qr_count = 0
         
     def start(self):
         """Start the camera and QR detection."""
         if not self.is_running:
             self.is_running = True
-            self.thread = threading.Thread(target=self._scan_loop, daemon=True)
+            self.frames = LatestFrameSlot()
+            self.started_at = time.monotonic()
+            self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.workers = [threading.Thread(target=self._decode_loop, daemon=True)]
+            if self.preview_enabled:
+                self.workers.append(threading.Thread(target=self._preview_loop, daemon=True))
             self.thread.start()
+            for worker in self.workers:
+                worker.start()
     
     def stop(self):
         """Stop the camera and QR detection."""
         self.is_running = False
+        if self.frames:
+            self.frames.close()
+        for thread in [self.thread] + self.workers:
+            if thread and thread is not threading.current_thread():
+                thread.join(timeout=1)
         if self.camera:
             self.camera.release()
             self.camera = None
-        if self.thread:
-            self.thread.join(timeout=1)
     
-    def _scan_loop(self):
-        """Main scanning loop running in separate thread."""
+    def get_stats(self) -> dict:
+        """Get frame counters and the preview stream's rate and bandwidth."""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_decoded': self.frames_decoded,
+            'frames_gated': self.frames_gated,  # seen by the decoder but skipped as static
+            'frames_dropped': self.frames_dropped,  # overwritten before the decoder saw them
+            'frames_previewed': self.frames_previewed,
+            'qr_detected': self.qr_count,
+            'qr_suppressed': self.scan_cooldown.suppressed,
+            'capture_fps': self.frames_captured / elapsed if elapsed else 0.0,
+            'decode_ms': self.decode_seconds * 1000 / self.frames_decoded if self.frames_decoded else 0.0,
+            'preview_bytes': self.preview_bytes,
+            'preview_fps': self.frames_previewed / elapsed if elapsed else 0.0,
+            'preview_kbps': self.preview_bytes * 8 / 1000 / elapsed if elapsed else 0.0
+        }
+    
+    def _prepare_for_decode(self, frame):
+        """Convert to grayscale once, then crop to the region of interest and downscale.
+        
+        Returns:
+            Tuple of (gray_image, (x_offset, y_offset)) for mapping results back to the frame
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        x0 = y0 = 0
+        if self.roi_fraction < 1.0:
+            h, w = gray.shape
+            crop_w, crop_h = int(w * self.roi_fraction), int(h * self.roi_fraction)
+            x0, y0 = (w - crop_w) // 2, (h - crop_h) // 2
+            gray = gray[y0:y0 + crop_h, x0:x0 + crop_w]
+        if self.decode_scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.decode_scale, fy=self.decode_scale,
+                              interpolation=cv2.INTER_AREA)
+        return gray, (x0, y0)
+    
+    def _handle_qr_data(self, qr_data: str):
+        """Apply the cooldown and hand a decoded payload to the app."""
+        self.qr_count += 1
+        
+        print(f"DEBUG: QR detected #{self.qr_count}: {qr_data}")
+        
+        # Check cooldown to avoid duplicate scans
+        if self.scan_cooldown.allow(qr_data, time.time()):
+            print(f"DEBUG: QR passed cooldown, triggering callback")
+            
+            # Callback to main app
+            if self.on_qr_detected:
+                try:
+                    self.on_qr_detected(qr_data)
+                except Exception as cb_error:
+                    print(f"Error in QR callback: {cb_error}")
+        else:
+            print(f"DEBUG: QR still in cooldown or duplicate")
+    
+    def _capture_loop(self):
+        """Read frames from the camera into the latest-frame slot."""
         try:
-            self.camera = cv2.VideoCapture(0)
+            self.camera = open_frame_source(self.source, self.width, self.height)
             
-            if not self.camera.isOpened():
-                print("Error: Could not open camera")
+            if not self.camera.open():
+                print(f"Error: Could not open {self.camera}")
                 self.is_running = False
                 return
             
-            # Set camera properties
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-            self.camera.set(cv2.CAP_PROP_FPS, 30)
-            
-            print(f"DEBUG: Camera initialized - {self.width}x{self.height}")
-            
-            frame_count = 0
-            qr_count = 0
+            print(f"DEBUG: Frame source {self.camera} initialized - {self.width}x{self.height}")
             
+            self.frames.lossless = not self.camera.is_live
+            frame_interval = 1.0 / self.fps
+            idle_interval = 1.0 / min(SCAN_IDLE_FPS, self.fps) if self.camera.is_live else frame_interval
             while self.is_running:
+                loop_start = time.monotonic()
                 ret, frame = self.camera.read()
                 
                 if not ret:
-                    print("Error: Could not read frame")
+                    if self.camera.is_live:
+                        print("Error: Could not read frame")
+                    else:
+                        print(f"DEBUG: End of {self.camera}")
                     break
                 
-                frame_count += 1
-                
-                # Decode QR codes in the frame
-                try:
-                    decoded_objects = pyzbar.decode(frame)
-                except Exception as e:
-                    print(f"Error decoding QR: {e}")
-                    decoded_objects = []
-                
-                # Draw rectangles around detected QR codes
-                for obj in decoded_objects:
-                    try:
-                        points = obj.polygon
-                        if len(points) == 4:
-                            pts = [(point.x, point.y) for point in points]
-                            pts = [pts[i] for i in range(4)]
-                            cv2.polylines(frame, [np.array(pts, dtype=np.int32)], True, (0, 255, 0), 3)
-                        
-                        qr_data = obj.data.decode('utf-8')
-                        current_time = time.time()
-                        qr_count += 1
-                        
-                        print(f"DEBUG: QR detected #{qr_count}: {qr_data}")
-                        
-                        # Check cooldown to avoid duplicate scans
-                        if (self.last_scanned is None or 
-                            self.last_scanned[0] != qr_data or 
-                            current_time - self.last_scanned[1] > self.scan_cooldown):
-                            
-                            self.last_scanned = (qr_data, current_time)
-                            print(f"DEBUG: QR passed cooldown, triggering callback")
-                            
-                            # Callback to main app
-                            if self.on_qr_detected:
-                                try:
-                                    self.on_qr_detected(qr_data)
-                                except Exception as cb_error:
-                                    print(f"Error in QR callback: {cb_error}")
-                        else:
-                            print(f"DEBUG: QR still in cooldown or duplicate")
-                    except Exception as decode_error:
-                        print(f"Error processing QR object: {decode_error}")
-                        continue
-                
-                # Convert frame to base64 for display
-                try:
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-                    self.current_frame_base64 = jpg_as_text
-                    
-                    # Update UI with new frame
-                    if self.on_frame_update:
-                        try:
-                            self.on_frame_update(jpg_as_text)
-                        except Exception as frame_error:
-                            print(f"Error updating frame: {frame_error}")
-                except Exception as encode_error:
-                    print(f"Error encoding frame: {encode_error}")
+                self.frames_captured += 1
+                self.frames.put(frame)
                 
-                # Print debug every 150 frames (~5 seconds at 30 FPS)
-                if frame_count % 150 == 0:
-                    print(f"DEBUG: Scanner running - {frame_count} frames, {qr_count} QRs detected")
+                # Print debug every 150 frames
+                if self.frames_captured % 150 == 0:
+                    stats = self.get_stats()
+                    print(f"DEBUG: Scanner running - {self.frames_captured} frames, "
+                          f"{self.frames_decoded} decoded, {self.frames_dropped} dropped, "
+                          f"{self.qr_count} QRs detected, preview {stats['preview_fps']:.1f} fps / "
+                          f"{stats['preview_kbps']:.0f} kbit/s")
                 
-                # Small delay to reduce CPU usage (~20 FPS)
-                time.sleep(0.05)
-            
-            print("DEBUG: Scan loop ended")
+                interval = idle_interval if self.motion_gate.is_static else frame_interval
+                time.sleep(max(0.0, interval - (time.monotonic() - loop_start)))
             
+            print("DEBUG: Capture loop ended")
+        
         except Exception as e:
-            print(f"Critical error in scan loop: {e}")
+            print(f"Critical error in capture loop: {e}")
             import traceback
             traceback.print_exc()
         finally:
+            # The decoder drains what is left, then clears is_running
+            self.frames.close()
             if self.camera:
                 self.camera.release()
-            print("DEBUG: Camera released")
\ No newline at end of file
+            print("DEBUG: Camera released")
+    
+    def decode_frame(self, frame, now: float = None, force: bool = False):
+        """Run the decode path on one BGR frame, without threads or callbacks.
+        
+        Args:
+            frame: BGR image as read from the camera
+            now: Monotonic timestamp for the motion gate (defaults to now)
+            force: Decode even if the motion gate reports a static scene
+        
+        Returns:
+            List of (qr_data, outline) tuples, where outline is a point array on
+            the full frame or None; None if the frame was skipped as static
+        """
+        now = time.monotonic() if now is None else now
+        gray, (x0, y0) = self._prepare_for_decode(frame)
+        if not self.motion_gate.should_decode(gray, now) and not force:
+            return None
+        
+        results = []
+        for obj in pyzbar.decode(gray):
+            try:
+                outline = None
+                points = obj.polygon
+                if len(points) == 4:
+                    # Map decode coordinates back onto the full frame
+                    outline = np.array(
+                        [(int(p.x / self.decode_scale) + x0, int(p.y / self.decode_scale) + y0)
+                         for p in points],
+                        dtype=np.int32
+                    )
+                results.append((obj.data.decode('utf-8'), outline))
+            except Exception as decode_error:
+                print(f"Error processing QR object: {decode_error}")
+        return results
+    
+    def _decode_loop(self):
+        """Decode the newest frame until the slot is closed and drained.
+        
+        From a live camera, frames that arrive meanwhile are dropped, not
+        queued; a recorded source waits for each frame to be taken.
+        """
+        try:
+            self._decode_frames()
+        finally:
+            self.is_running = False
+    
+    def _decode_frames(self):
+        seq = 0
+        while True:
+            last_seq = seq
+            seq, frame = self.frames.get(seq, take=True)
+            if frame is None:
+                if self.frames.closed:
+                    break
+                continue
+            self.frames_dropped += max(0, seq - last_seq - 1)
+            loop_start = time.monotonic()
+            
+            try:
+                results = self.decode_frame(frame, loop_start)
+            except Exception as e:
+                print(f"Error decoding QR: {e}")
+                continue
+            
+            if results is None:
+                self.frames_gated += 1
+                continue
+            
+            self.frames_decoded += 1
+            self.decode_seconds += time.monotonic() - loop_start
+            self.outlines = [outline for _, outline in results if outline is not None]
+            for qr_data, _ in results:
+                self._handle_qr_data(qr_data)
+    
+    def _preview_loop(self):
+        """Encode the newest frame for the UI, capped at ``preview_fps``."""
+        seq = 0
+        frame_interval = 1.0 / self.preview_fps
+        encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(self.jpeg_quality)]
+        while self.is_running and not self.frames.closed:
+            seq, frame = self.frames.get(seq)
+            if frame is None:
+                continue
+            loop_start = time.monotonic()
+            
+            # Draw rectangles around detected QR codes (on a copy; the decoder may still read it)
+            outlines = self.outlines
+            if outlines:
+                frame = frame.copy()
+                cv2.polylines(frame, outlines, True, (0, 255, 0), 3)
+            
+            # Downscale for the UI; decoding always uses the full-resolution frame
+            if self.preview_width and frame.shape[1] > self.preview_width:
+                scale = self.preview_width / frame.shape[1]
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            
+            # Convert frame to base64 for display
+            try:
+                _, buffer = cv2.imencode('.jpg', frame, encode_params)
+                jpg_as_text = base64.b64encode(buffer).decode('utf-8')
+                self.current_frame_base64 = jpg_as_text
+                self.frames_previewed += 1
+                self.preview_bytes += len(jpg_as_text)
+                
+                # Update UI with new frame
+                if self.on_frame_update:
+                    try:
+                        self.on_frame_update(jpg_as_text)
+                    except Exception as frame_error:
+                        print(f"Error updating frame: {frame_error}")
+            except Exception as encode_error:
+                print(f"Error encoding frame: {encode_error}")
+            
+            time.sleep(max(0.0, frame_interval - (time.monotonic() - loop_start)))
@@ -0,0 +1,125 @@
+# utils/scan_executor.py
+"""Bounded, ordered processing of scans and timer-based hiding of result banners."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+from config.constants import SCAN_QUEUE_SIZE
+
+
+class AsyncScanExecutor:
+    """Await a coroutine handler for each scan, in order, on an asyncio event loop.
+    
+    One consumer task drains a bounded queue, so a burst of detections
+    waits its turn instead of starting a thread each, and once the queue is
+    full further scans are rejected rather than piling up. submit() may be
+    called from any thread (the camera calls it from its decode thread).
+    """
+    
+    def __init__(self, handler: Callable, loop: asyncio.AbstractEventLoop, max_pending: int = SCAN_QUEUE_SIZE):
+        """Initialize and start the consumer task.
+        
+        Args:
+            handler: Coroutine function called with each submitted item
+            loop: Event loop the handler runs on
+            max_pending: Scans allowed to wait; submit() rejects scans beyond it
+        """
+        self.handler = handler
+        self.loop = loop
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)  # seconds from submit to done
+        self._pending = 0
+        self._queue = None
+        self.submitted = 0
+        self.processed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.is_running = True
+        asyncio.run_coroutine_threadsafe(self._work(), loop)
+    
+    def submit(self, item) -> bool:
+        """Queue ``item`` for processing; returns False if the queue is full or stopped."""
+        with self._lock:
+            if not self.is_running or self._pending >= self.max_pending:
+                self.rejected += 1
+                print(f"Scan queue full, dropping scan: {item}")
+                return False
+            self._pending += 1
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._pending)
+        self.loop.call_soon_threadsafe(self._put, (item, time.monotonic()))
+        return True
+    
+    def shutdown(self):
+        """Stop the consumer after the scans already queued."""
+        self.is_running = False
+        self.loop.call_soon_threadsafe(self._put, (None, None))
+    
+    def get_stats(self) -> Dict:
+        """Get queue depth, counters and recent submit-to-done latency."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'queued': self._pending,
+                'max_depth': self.max_depth,
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'rejected': self.rejected,
+                'latency_ms_p50': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+                'latency_ms_max': latencies[-1] * 1000 if latencies else 0.0
+            }
+    
+    def _put(self, entry):
+        # Runs on the loop, before or after _work has created the queue
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._queue.put_nowait(entry)
+    
+    async def _work(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        while True:
+            item, submitted_at = await self._queue.get()
+            if submitted_at is None:
+                break
+            try:
+                await self.handler(item)
+            except Exception as e:
+                print(f"Error processing scan: {e}")
+                import traceback
+                traceback.print_exc()
+            with self._lock:
+                self._pending -= 1
+                self.processed += 1
+                self._latencies.append(time.monotonic() - submitted_at)
+
+
+class BannerScheduler:
+    """Show a banner and hide it after a delay, without parking a worker in time.sleep().
+    
+    show() must be called on ``loop``; the hide is scheduled with
+    loop.call_later. Showing a new message cancels the pending hide, so an
+    older timer can never hide a newer message early.
+    """
+    
+    def __init__(self, hide: Callable[[], None], loop: asyncio.AbstractEventLoop):
+        self.hide = hide
+        self.loop = loop
+        self._timer = None
+    
+    def show(self, apply: Callable[[], None], duration: float):
+        """Run ``apply`` to display a message, then hide it after ``duration`` seconds."""
+        if self._timer:
+            self._timer.cancel()
+        apply()
+        self._timer = self.loop.call_later(duration, self._expire)
+    
+    def _expire(self):
+        self._timer = None
+        try:
+            self.hide()
+        except Exception as e:
+            print(f"Error hiding banner: {e}")
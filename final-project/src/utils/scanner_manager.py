@@ -0,0 +1,126 @@
+# utils/scanner_manager.py
+"""Run several QR scanners (cameras or video files) from one process."""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+from utils.qr_scanner import QRCameraScanner
+from config.constants import CAMERA_WIDTH, CAMERA_HEIGHT, QR_SCAN_COOLDOWN
+
+
+class ScannerManager:
+    """Drive one QRCameraScanner per gate and funnel all scans into one writer.
+    
+    Every camera decodes on its own threads, but attendance is written by a
+    single writer thread in arrival order, so concurrent lanes never race
+    each other on the database.
+    """
+    
+    def __init__(self, db, event_id: str, scanner_username: Optional[str] = None,
+                 on_result: Optional[Callable[[str, Dict], None]] = None):
+        """Initialize the manager.
+        
+        Args:
+            db: Database or APIDatabase used to record scans
+            event_id: Event the scans are recorded for
+            scanner_username: Username recorded in scan history
+            on_result: Called with (camera_name, process_scan result) after each write
+        """
+        self.db = db
+        self.event_id = event_id
+        self.scanner_username = scanner_username
+        self.on_result = on_result
+        self.cameras: Dict[str, Dict] = {}
+        self._scans = queue.Queue()
+        self._writer = None
+        self.is_running = False
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.status_counts: Dict[str, int] = {}
+    
+    def add_camera(self, name: str, source, time_slot: str,
+                   on_frame_update: Optional[Callable[[str], None]] = None) -> QRCameraScanner:
+        """Register a camera index or video file that records into ``time_slot``."""
+        scanner = QRCameraScanner(
+            lambda qr_data, camera=name: self._enqueue(camera, qr_data),
+            on_frame_update,
+            CAMERA_WIDTH,
+            CAMERA_HEIGHT,
+            QR_SCAN_COOLDOWN,
+            source=source
+        )
+        self.cameras[name] = {'scanner': scanner, 'time_slot': time_slot, 'source': source, 'scans': 0}
+        if self.is_running:
+            scanner.start()
+        return scanner
+    
+    def start(self):
+        """Start the shared writer and every registered camera."""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        for camera in self.cameras.values():
+            camera['scanner'].start()
+    
+    def stop(self):
+        """Stop all cameras, then let the writer finish the scans already queued."""
+        for camera in self.cameras.values():
+            camera['scanner'].stop()
+        self.is_running = False
+        self._scans.put(None)
+        if self._writer:
+            self._writer.join(timeout=5)
+    
+    @property
+    def cameras_running(self) -> bool:
+        """True while any camera is still capturing or decoding (a recorded source ends on its own)."""
+        return any(camera['scanner'].is_running for camera in self.cameras.values())
+    
+    def _enqueue(self, camera: str, qr_data: str):
+        """Called from a camera's decode thread; hands the scan to the writer."""
+        self._scans.put((camera, qr_data))
+    
+    def _write_loop(self):
+        """Record queued scans one at a time."""
+        while True:
+            item = self._scans.get()
+            if item is None:
+                break
+            camera, qr_data = item
+            time_slot = self.cameras[camera]['time_slot']
+            start = time.monotonic()
+            try:
+                result = self.db.process_scan(self.event_id, qr_data, time_slot, self.scanner_username)
+            except Exception as e:
+                print(f"Error recording scan from {camera}: {e}")
+                result = {'status': 'error', 'student': None, 'time_slot': time_slot, 'summary': {}}
+            self.write_seconds += time.monotonic() - start
+            self.writes += 1
+            self.cameras[camera]['scans'] += 1
+            self.status_counts[result['status']] = self.status_counts.get(result['status'], 0) + 1
+            
+            if self.on_result:
+                try:
+                    self.on_result(camera, result)
+                except Exception as e:
+                    print(f"Error in scan result callback: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Get per-camera frame stats plus the shared writer's counters."""
+        cameras = {}
+        for name, camera in self.cameras.items():
+            stats = camera['scanner'].get_stats()
+            stats.update(source=camera['source'], time_slot=camera['time_slot'], scans=camera['scans'])
+            cameras[name] = stats
+        return {
+            'cameras': cameras,
+            'writer': {
+                'writes': self.writes,
+                'pending': self._scans.qsize(),
+                'write_ms': self.write_seconds * 1000 / self.writes if self.writes else 0.0,
+                'statuses': dict(self.status_counts)
+            }
+        }
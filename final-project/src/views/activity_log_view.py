@@ -1,6 +1,7 @@
 # views/activity_log_view.py
 """View for admin to see recent login and scan activity."""
 
+import asyncio
 import flet as ft
 from views.base_view import BaseView
 from config.constants import PRIMARY_COLOR, BLUE_50
@@ -18,7 +19,7 @@ class ActivityLogView(BaseView):
         """
         super().__init__(app)
     
-    def build(self):
+    async def build(self):
         """Build and return the activity log view."""
         try:
             # Create a container that will hold the tabs
@@ -28,7 +29,7 @@ class ActivityLogView(BaseView):
             self.tabs_container = tabs_container
             
             # Initial build of tabs
-            self._update_tabs(tabs_container)
+            await self._update_tabs(tabs_container)
             
             # Create the view
             view = ft.View(
@@ -57,12 +58,24 @@ class ActivityLogView(BaseView):
                 ]
             )
     
-    def _update_tabs(self, container):
+    async def _update_tabs(self, container):
         """Update the tabs with fresh data."""
         try:
+            # Fetch both lists at once (reduced from 50 to 15 for performance)
+            logins, scans = await asyncio.gather(
+                self.adb.get_recent_logins(limit=15),
+                self.adb.get_recent_scans(limit=15)
+            )
+            
+            # Look up each event the scans refer to once, concurrently
+            event_ids = list({scan['event_id'] for scan in scans or []})
+            events = dict(zip(event_ids, await asyncio.gather(
+                *(self.adb.get_event_by_id(event_id) for event_id in event_ids)
+            )))
+            
             # Create tab view for logins and scans
-            login_tab = self._build_login_tab()
-            scan_tab = self._build_scan_tab()
+            login_tab = self._build_login_tab(logins)
+            scan_tab = self._build_scan_tab(scans, events)
             
             # Create tabs
             tabs = ft.Tabs(
@@ -91,21 +104,18 @@ class ActivityLogView(BaseView):
         """Refresh activity log data (called by sync service)."""
         try:
             if hasattr(self, 'tabs_container'):
-                self._update_tabs(self.tabs_container)
+                self.page.run_task(self._update_tabs, self.tabs_container)
         except Exception as e:
             print(f"Error refreshing activity log: {e}")
     
     def on_view_enter(self):
         """Called when the view is entered - refresh data."""
         if hasattr(self, 'tabs_container'):
-            self._update_tabs(self.tabs_container)
+            self.page.run_task(self._update_tabs, self.tabs_container)
     
-    def _build_login_tab(self) -> ft.Control:
+    def _build_login_tab(self, logins: list) -> ft.Control:
         """Build the login history tab."""
         try:
-            # Get recent logins - reduced from 50 to 15 for performance
-            logins = self.db.get_recent_logins(limit=15)
-            
             # Create login list with lazy loading
             login_list = ft.ListView(spacing=8, padding=10, expand=True, auto_scroll=False)
             
@@ -141,12 +151,9 @@ class ActivityLogView(BaseView):
                 alignment=ft.alignment.center
             )
     
-    def _build_scan_tab(self) -> ft.Control:
+    def _build_scan_tab(self, scans: list, events: dict) -> ft.Control:
         """Build the scan history tab."""
         try:
-            # Get recent scans - reduced from 50 to 15 for performance
-            scans = self.db.get_recent_scans(limit=15)
-            
             # Create scan list with lazy loading
             scan_list = ft.ListView(spacing=8, padding=10, expand=True, auto_scroll=False)
             
@@ -167,7 +174,7 @@ class ActivityLogView(BaseView):
                 )
             else:
                 for scan in scans:
-                    scan_card = self._create_scan_card(scan)
+                    scan_card = self._create_scan_card(scan, events.get(scan['event_id']))
                     scan_list.controls.append(scan_card)
             
             return ft.Container(
@@ -253,12 +260,11 @@ class ActivityLogView(BaseView):
             )
         )
     
-    def _create_scan_card(self, scan: dict) -> ft.Card:
+    def _create_scan_card(self, scan: dict, event: dict = None) -> ft.Card:
         """Create a card for a scan entry."""
         scan_time_str = self._format_datetime(scan['scan_time'])
         
         # Get event name if available
-        event = self.db.get_event_by_id(scan['event_id'])
         event_name = event['name'] if event else f"Event {scan['event_id']}"
         
         return ft.Card(
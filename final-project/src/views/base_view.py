@@ -16,6 +16,7 @@ class BaseView:
         self.app = app
         self.page = app.page
         self.db = app.db
+        self.adb = app.adb
     
     def build(self, *args, **kwargs):
         """Build and return the view. Must be implemented by subclasses.
@@ -1,6 +1,7 @@
 # views/enhanced_event_view.py
 """Event view with enhanced PDF export."""
 
+import asyncio
 import flet as ft
 from views.base_view import BaseView
 from utils.pdf_export import AttendancePDFExporter
@@ -14,12 +15,12 @@ import tkinter as tk
 class EventView(BaseView):
     """Event detail with grouped attendance export."""
     
-    def build(self, event_id: str):
+    async def build(self, event_id: str):
         """Build event detail view."""
         try:
             print(f"DEBUG: Building event view for event_id: {event_id}")
             
-            event = self.db.get_event_by_id(event_id)
+            event = await self.adb.get_event_by_id(event_id)
             if not event:
                 print(f"DEBUG: Event not found: {event_id}")
                 self.page.go("/home")
@@ -27,13 +28,18 @@ class EventView(BaseView):
             
             print(f"DEBUG: Event found: {event}")
             
-            # Get current user role
+            # Get current user role and attendance by section concurrently
             current_username = self.app.current_user
-            current_user_role = self.db.get_user_role(current_username) if current_username else 'scanner'
+            if current_username:
+                current_user_role, attendance_by_section = await asyncio.gather(
+                    self.adb.get_user_role(current_username),
+                    self.adb.get_attendance_by_section(event_id)
+                )
+            else:
+                current_user_role = 'scanner'
+                attendance_by_section = await self.adb.get_attendance_by_section(event_id)
             is_admin = current_user_role and current_user_role.lower() == 'admin'
             
-            # Get attendance by section
-            attendance_by_section = self.db.get_attendance_by_section(event_id)
             print(f"DEBUG: attendance_by_section: {attendance_by_section}")
             
             if not attendance_by_section:
@@ -135,7 +141,7 @@ class EventView(BaseView):
                 expand=True
             )
             
-            def export_to_pdf(e):
+            async def export_to_pdf(e):
                 """Export attendance to PDF with file picker."""
                 # Check if user is admin
                 if not is_admin:
@@ -184,7 +190,7 @@ class EventView(BaseView):
                             return None
                     
                     # Run file picker in background thread
-                    filepath = pick_save_location()
+                    filepath = await asyncio.to_thread(pick_save_location)
                     
                     if not filepath:
                         print("DEBUG: No file location selected")
@@ -195,9 +201,9 @@ class EventView(BaseView):
                     # Create parent directory if it doesn't exist
                     os.makedirs(os.path.dirname(filepath), exist_ok=True)
                     
-                    # Export
+                    # Export off the event loop
                     exporter = AttendancePDFExporter(self.db)
-                    result = exporter.export_attendance(event_id, filepath)
+                    result = await self.adb.run(exporter.export_attendance, event_id, filepath)
                     
                     # Verify file was created
                     if os.path.exists(filepath):
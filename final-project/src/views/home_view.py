@@ -10,14 +10,14 @@ from datetime import datetime
 class HomeView(BaseView):
     """Home screen with premium styling, sorting, and filters."""
 
-    def build(self, sort_option="date_desc", filter_option="all"):
+    async def build(self, sort_option="date_desc", filter_option="all"):
         """Build and return the premium styled home view."""
         try:
-            events = self.db.get_all_events()
+            events = await self.adb.get_all_events()
             
             # Get current user role
             current_username = self.app.current_user
-            current_user_role = self.db.get_user_role(current_username) if current_username else 'user'
+            current_user_role = await self.adb.get_user_role(current_username) if current_username else 'user'
             is_admin = current_user_role == 'admin'
 
             def parse_event_date(event_date_str: str):
@@ -79,21 +79,22 @@ class HomeView(BaseView):
                     return [(eid, data) for eid, data in events_list if is_event_today(data['date'])]
                 return events_list
 
-            def handle_sort_change(e):
+            async def handle_sort_change(e):
                 """Handle sort option change."""
-                refresh_view(e.control.value, filter_option)
+                await refresh_view(e.control.value, filter_option)
 
-            def handle_filter_change(e):
+            async def handle_filter_change(e):
                 """Handle filter option change."""
-                refresh_view(sort_option, e.control.value)
+                await refresh_view(sort_option, e.control.value)
 
-            def refresh_view(new_sort=None, new_filter=None):
+            async def refresh_view(new_sort=None, new_filter=None):
                 """Refresh the view with new sort/filter settings."""
-                self.page.views.clear()
-                self.page.views.append(self.build(
+                new_view = await self.build(
                     sort_option=new_sort or sort_option,
                     filter_option=new_filter or filter_option
-                ))
+                )
+                self.page.views.clear()
+                self.page.views.append(new_view)
                 self.page.update()
 
             def handle_scan_click(event_id: str, event_date: str, event_name: str):
@@ -179,12 +180,12 @@ class HomeView(BaseView):
 
             def delete_event_handler(event_id: str, event_name: str):
                 """Handle event deletion with confirmation dialog."""
-                def confirm_delete(e):
+                async def confirm_delete(e):
                     try:
-                        self.db.delete_event(event_id)
+                        await self.adb.delete_event(event_id)
                         self.show_snackbar(f"Γ£ô Event '{event_name}' deleted successfully", ft.Colors.GREEN_600)
                         self.page.close(dialog)
-                        refresh_view()
+                        await refresh_view()
                     except Exception as ex:
                         self.show_snackbar(f"Γ£ù Error deleting event: {str(ex)}", ft.Colors.RED_600)
                         self.page.close(dialog)
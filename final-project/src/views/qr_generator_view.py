@@ -3,14 +3,17 @@
 
 import flet as ft
 import csv
-import io
+import json
 import os
-import qrcode
-import base64
+import zipfile
 from datetime import datetime
 from views.base_view import BaseView
-from config.constants import PRIMARY_COLOR, BLUE_50
+from config.constants import PRIMARY_COLOR, BLUE_50, QR_PREVIEW_PAGE_SIZE
 from database.db_manager import Database
+from utils.qr_generator import QRBatchGenerator, render_qr_png, render_qr_thumbnail
+
+# Refresh the progress text every this many generated QR codes
+PROGRESS_REFRESH_EVERY = 25
 
 
 class QRGeneratorView(BaseView):
@@ -20,7 +23,6 @@ class QRGeneratorView(BaseView):
         """Initialize with access to the app and database."""
         super().__init__(app)
         self.db = app.db
-        self.qr_codes_data = []
     
     def _extract_name_from_csv_data(self, row_data: dict) -> tuple:
         """Extract name components from CSV row data.
@@ -59,10 +61,25 @@ class QRGeneratorView(BaseView):
                 color=ft.Colors.GREY_600
             )
             
-            qr_output = ft.Column(
+            # Only the current page of thumbnails is ever sent to the client
+            qr_output = ft.GridView(
+                expand=True,
+                max_extent=200,
+                child_aspect_ratio=0.7,
                 spacing=10,
-                scroll=ft.ScrollMode.AUTO,
-                expand=True
+                run_spacing=10
+            )
+            
+            page_label = ft.Text("", size=12, color=ft.Colors.GREY_600)
+            prev_page_button = ft.IconButton(
+                icon=ft.Icons.CHEVRON_LEFT,
+                tooltip="Previous page",
+                disabled=True
+            )
+            next_page_button = ft.IconButton(
+                icon=ft.Icons.CHEVRON_RIGHT,
+                tooltip="Next page",
+                disabled=True
             )
             
             status_text = ft.Text(
@@ -72,8 +89,124 @@ class QRGeneratorView(BaseView):
                 weight=ft.FontWeight.BOLD
             )
             
+            cancel_button = ft.OutlinedButton(
+                "Cancel",
+                icon=ft.Icons.CANCEL,
+                visible=False
+            )
+            
             # Store student data for database insertion
             students_data = []
+            preview_page = [0]
+            generator = [None]  # QRBatchGenerator currently running
+            
+            def create_qr_card(student: dict):
+                """Create the preview card for one student, using a small thumbnail."""
+                qr_data = student['qr_data']
+                return ft.Card(
+                    content=ft.Container(
+                        content=ft.Column(
+                            [
+                                ft.Text(
+                                    f"{student['school_id']}: {student['name']}",
+                                    size=12,
+                                    weight=ft.FontWeight.BOLD,
+                                    color=ft.Colors.GREY_800,
+                                    max_lines=2
+                                ),
+                                ft.Image(
+                                    src_base64=render_qr_thumbnail(qr_data),
+                                    width=120,
+                                    height=120,
+                                    fit=ft.ImageFit.CONTAIN
+                                ),
+                                ft.ElevatedButton(
+                                    "Download",
+                                    icon=ft.Icons.DOWNLOAD,
+                                    on_click=lambda e, data=qr_data: download_single_qr(data),
+                                    style=ft.ButtonStyle(
+                                        bgcolor=PRIMARY_COLOR,
+                                        color=ft.Colors.BLACK
+                                    )
+                                )
+                            ],
+                            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                            spacing=8
+                        ),
+                        padding=10,
+                        bgcolor=BLUE_50,
+                        border_radius=10
+                    )
+                )
+            
+            def show_preview_page(page_index: int):
+                """Render the thumbnails for one page of the roster."""
+                total_pages = max(1, -(-len(students_data) // QR_PREVIEW_PAGE_SIZE))
+                page_index = min(max(page_index, 0), total_pages - 1)
+                preview_page[0] = page_index
+                
+                start = page_index * QR_PREVIEW_PAGE_SIZE
+                qr_output.controls = [
+                    create_qr_card(student)
+                    for student in students_data[start:start + QR_PREVIEW_PAGE_SIZE]
+                ]
+                page_label.value = f"Page {page_index + 1} of {total_pages}" if students_data else ""
+                prev_page_button.disabled = page_index == 0
+                next_page_button.disabled = page_index >= total_pages - 1
+                
+                qr_output.update()
+                page_label.update()
+                prev_page_button.update()
+                next_page_button.update()
+            
+            prev_page_button.on_click = lambda e: show_preview_page(preview_page[0] - 1)
+            next_page_button.on_click = lambda e: show_preview_page(preview_page[0] + 1)
+            
+            def is_generating() -> bool:
+                """Tell the user to wait if full-resolution QR codes are being generated."""
+                if generator[0] and generator[0].is_running:
+                    self.show_snackbar("Wait for QR generation to finish", ft.Colors.ORANGE)
+                    return True
+                return False
+            
+            def generate_full_resolution(label: str, on_result, on_finished):
+                """Render full-resolution QR codes for the roster in the background.
+                
+                Args:
+                    label: Progress message prefix
+                    on_result: Called with (index, qr_data, png_bytes) for each image
+                    on_finished: Called with True when done, False when cancelled or failed
+                """
+                def on_progress(done: int, total: int):
+                    if done % PROGRESS_REFRESH_EVERY == 0 or done == total:
+                        status_text.value = f"{label}... {done}/{total}"
+                        status_text.update()
+                
+                def on_done(finished: bool):
+                    cancel_button.visible = False
+                    cancel_button.update()
+                    on_finished(finished)
+                
+                status_text.value = f"{label}... 0/{len(students_data)}"
+                status_text.color = ft.Colors.GREY_700
+                cancel_button.visible = True
+                status_text.update()
+                cancel_button.update()
+                
+                generator[0] = QRBatchGenerator(
+                    [student['qr_data'] for student in students_data],
+                    on_result=on_result,
+                    on_progress=on_progress,
+                    on_done=on_done
+                )
+                generator[0].start()
+            
+            def cancel_generation(e):
+                """Cancel the running QR generation."""
+                if generator[0]:
+                    generator[0].cancel()
+            
+            cancel_button.on_click = cancel_generation
             
             def handle_file_pick(e):
                 """Handle file selection."""
@@ -94,15 +227,13 @@ class QRGeneratorView(BaseView):
                             status_text.update()
                             return
                         
-                        # Clear previous QR codes
-                        qr_output.controls.clear()
-                        self.qr_codes_data.clear()
+                        # Stop a running export and clear the previous roster
+                        if generator[0]:
+                            generator[0].cancel()
                         students_data.clear()
                         
-                        valid_count = 0
-                        
-                        # Generate QR code for each row
-                        for idx, row in enumerate(rows, 1):
+                        # QR images are rendered later: thumbnails per page, full size on export
+                        for row in rows:
                             # Use school ID from 'Student Number' column
                             school_id = row.get('Student Number', '').strip()
                             
@@ -112,27 +243,8 @@ class QRGeneratorView(BaseView):
                             # Extract name components from structured CSV data
                             formatted_name, last_name, first_name, middle_initial = self._extract_name_from_csv_data(row)
                             
-                            # Generate QR code with both ID and formatted name (separated by pipe)
+                            # QR payload holds both ID and formatted name (separated by pipe)
                             qr_data = f"{school_id}|{formatted_name}"
-                            qr = qrcode.QRCode(
-                                version=1,
-                                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                                box_size=10,
-                                border=2,
-                            )
-                            qr.add_data(qr_data)
-                            qr.make(fit=True)
-                            
-                            # Convert to image and then to base64
-                            img = qr.make_image(fill_color="black", back_color="white")
-                            
-                            # Convert PIL image to base64
-                            buffer = io.BytesIO()
-                            img.save(buffer, format='PNG')
-                            img_base64 = base64.b64encode(buffer.getvalue()).decode()
-                            
-                            # Store QR code data and student info
-                            self.qr_codes_data.append((qr_data, img_base64))
                             students_data.append({
                                 "school_id": school_id,
                                 "name": formatted_name,
@@ -142,69 +254,23 @@ class QRGeneratorView(BaseView):
                                 "qr_data": qr_data,
                                 "row_data": row
                             })
-                            
-                            # Create card for each QR code
-                            qr_card = ft.Card(
-                                content=ft.Container(
-                                    content=ft.Column(
-                                        [
-                                            ft.Text(
-                                                f"{school_id}: {formatted_name}",
-                                                size=12,
-                                                weight=ft.FontWeight.BOLD,
-                                                color=ft.Colors.GREY_800
-                                            ),
-                                            ft.Image(
-                                                src_base64=img_base64,
-                                                width=200,
-                                                height=200,
-                                                fit=ft.ImageFit.CONTAIN
-                                            ),
-                                            ft.Text(
-                                                f"Payload: {qr_data}",
-                                                size=10,
-                                                color=ft.Colors.GREY_500
-                                            ),
-                                            ft.ElevatedButton(
-                                                "Download",
-                                                icon=ft.Icons.DOWNLOAD,
-                                                width=180,
-                                                on_click=lambda e, data=qr_data, b64=img_base64: 
-                                                    download_single_qr(data, b64),
-                                                style=ft.ButtonStyle(
-                                                    bgcolor=PRIMARY_COLOR,
-                                                    color=ft.Colors.BLACK
-                                                )
-                                            )
-                                        ],
-                                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                                        spacing=10
-                                    ),
-                                    padding=15,
-                                    bgcolor=BLUE_50,
-                                    border_radius=10
-                                )
-                            )
-                            qr_output.controls.append(qr_card)
-                            valid_count += 1
                         
-                        # Show results summary
-                        if valid_count > 0:
-                            status_text.value = f"Generated {valid_count} QR code(s)"
+                        show_preview_page(0)
+                        
+                        if students_data:
+                            status_text.value = f"Loaded {len(students_data)} student(s)"
                             status_text.color = ft.Colors.GREEN
                         else:
                             status_text.value = "No data found in CSV"
                             status_text.color = ft.Colors.RED
                         
-                        qr_output.update()
-                        
                     except Exception as ex:
                         status_text.value = f"Error: {str(ex)}"
                         status_text.color = ft.Colors.RED
                     
                     status_text.update()
             
-            def download_single_qr(qr_data: str, img_base64: str):
+            def download_single_qr(qr_data: str):
                 """Handle single QR code download with folder selection."""
                 # Create a callback for folder selection
                 def on_folder_selected(e):
@@ -219,10 +285,9 @@ class QRGeneratorView(BaseView):
                             filename = f"QR_{safe_name}_{timestamp}.png"
                             file_path = os.path.join(qr_dir, filename)
                             
-                            # Decode base64 and save image
-                            img_data = base64.b64decode(img_base64)
+                            # Render the full-resolution image only now
                             with open(file_path, 'wb') as f:
-                                f.write(img_data)
+                                f.write(render_qr_png(qr_data))
                             
                             self.show_snackbar(f"QR code saved: {filename}", ft.Colors.GREEN)
                         except Exception as ex:
@@ -233,36 +298,56 @@ class QRGeneratorView(BaseView):
                 folder_picker.get_directory_path("Select folder to save QR code")
             
             def download_all_qrs(e):
-                """Download all generated QR codes after user selects a folder."""
-                if not self.qr_codes_data:
+                """Export all QR codes into a single ZIP file after user selects a folder."""
+                if not students_data:
                     self.show_snackbar("No QR codes to download", ft.Colors.ORANGE)
                     return
+                if is_generating():
+                    return
                 
                 def on_folder_selected(e):
                     if e.path:
+                        base_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        zip_path = os.path.join(e.path, f"QR_Codes_{base_timestamp}.zip")
                         try:
-                            qr_dir = e.path
-                            os.makedirs(qr_dir, exist_ok=True)
-                            
-                            count = 0
-                            base_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            for idx, (qr_data, img_base64) in enumerate(self.qr_codes_data, 1):
-                                safe_name = "".join(c if c.isalnum() or c in ('-', '_') else '_' for c in qr_data)
-                                filename = f"QR_{safe_name}_{base_timestamp}_{idx:03d}.png"
-                                file_path = os.path.join(qr_dir, filename)
-                                
-                                img_data = base64.b64decode(img_base64)
-                                with open(file_path, 'wb') as f:
-                                    f.write(img_data)
-                                count += 1
-                            
-                            self.show_snackbar(f"Downloaded {count} QR code(s) successfully!", ft.Colors.GREEN)
+                            os.makedirs(e.path, exist_ok=True)
+                            # PNGs are already compressed, so entries are stored as-is
+                            archive = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED)
                         except Exception as ex:
                             self.show_snackbar(f"Download error: {str(ex)}", ft.Colors.RED)
+                            return
+                        
+                        written = [0]
+                        
+                        def write_qr(index: int, qr_data: str, png: bytes):
+                            # Each image is appended to the archive as soon as it is rendered
+                            safe_name = "".join(c if c.isalnum() or c in ('-', '_') else '_' for c in qr_data)
+                            archive.writestr(f"QR_{safe_name}_{index + 1:05d}.png", png)
+                            written[0] += 1
+                        
+                        def on_finished(finished: bool):
+                            try:
+                                archive.close()
+                                if not finished:
+                                    os.remove(zip_path)
+                            except OSError as ex:
+                                print(f"Error closing QR archive: {ex}")
+                                finished = False
+                            
+                            if finished:
+                                status_text.value = f"Exported {written[0]} QR code(s) to {os.path.basename(zip_path)}"
+                                status_text.color = ft.Colors.GREEN
+                                self.show_snackbar(f"Downloaded {written[0]} QR code(s) successfully!", ft.Colors.GREEN)
+                            else:
+                                status_text.value = f"Export stopped after {written[0]} of {len(students_data)} QR code(s)"
+                                status_text.color = ft.Colors.ORANGE
+                            status_text.update()
+                        
+                        generate_full_resolution("Exporting QR codes", write_qr, on_finished)
                 
                 # Set the callback and open folder picker
                 folder_picker.on_result = on_folder_selected
-                folder_picker.get_directory_path(f"Select folder to save {len(self.qr_codes_data)} QR code(s)")
+                folder_picker.get_directory_path(f"Select folder for the ZIP of {len(students_data)} QR code(s)")
             
             def save_students_to_db(e):
                 """Save all students to database with their QR codes after confirmation."""
@@ -278,49 +363,24 @@ class QRGeneratorView(BaseView):
                         # Close dialog first
                         self.page.close(dlg)
                         
-                        saved_count = 0
-                        failed_count = 0
+                        # Only the payload is stored; QR images are regenerated from qr_data
+                        rows = [
+                            {
+                                "school_id": student['school_id'],
+                                "name": student['name'],
+                                "qr_data": student['qr_data'],
+                                "csv_data": json.dumps(student['row_data']),
+                                "last_name": student.get('last_name'),
+                                "first_name": student.get('first_name'),
+                                "middle_initial": student.get('middle_initial'),
+                            }
+                            for student in students_data
+                        ]
                         
-                        for student in students_data:
-                            try:
-                                # Check if student already exists
-                                existing = self.db.get_student_by_id(student['school_id'])
-                                
-                                # Find the base64 encoded version
-                                b64_encoded = next((b64 for data, b64 in self.qr_codes_data if data == student['qr_data']), None)
-                                
-                                if existing:
-                                    # Update existing student
-                                    success = self.db.update_student(
-                                        student['school_id'],
-                                        student['name'],
-                                        student['qr_data'],
-                                        b64_encoded,
-                                        str(student['row_data']),
-                                        student.get('last_name'),
-                                        student.get('first_name'),
-                                        student.get('middle_initial')
-                                    )
-                                else:
-                                    # Create new student
-                                    success = self.db.create_student(
-                                        student['school_id'],
-                                        student['name'],
-                                        student['qr_data'],
-                                        b64_encoded,
-                                        str(student['row_data']),
-                                        student.get('last_name'),
-                                        student.get('first_name'),
-                                        student.get('middle_initial')
-                                    )
-                                
-                                if success:
-                                    saved_count += 1
-                                else:
-                                    failed_count += 1
-                            except Exception as ex:
-                                print(f"Error saving student {student.get('school_id')}: {ex}")
-                                failed_count += 1
+                        # One transaction (or a few batched API calls) for the whole roster
+                        counts = self.db.bulk_upsert_students(rows)
+                        saved_count = counts['inserted'] + counts['updated']
+                        failed_count = counts['failed']
                         
                         message = f"Saved {saved_count} student(s) to database"
                         if failed_count > 0:
@@ -411,12 +471,12 @@ class QRGeneratorView(BaseView):
                                 ),
                                 selected_file_name,
                                 ft.Divider(),
-                                status_text,
+                                ft.Row([status_text, cancel_button], spacing=10),
                                 ft.Container(height=10),
                                 ft.Row(
                                     [
                                         ft.ElevatedButton(
-                                            "Download All QR Codes",
+                                            "Download All (ZIP)",
                                             icon=ft.Icons.DOWNLOAD,
                                             on_click=download_all_qrs,
                                             style=ft.ButtonStyle(
@@ -437,10 +497,18 @@ class QRGeneratorView(BaseView):
                                     spacing=10,
                                     wrap=True
                                 ),
-                                ft.Text(
-                                    "Generated QR Codes",
-                                    size=16,
-                                    weight=ft.FontWeight.BOLD
+                                ft.Row(
+                                    [
+                                        ft.Text(
+                                            "Generated QR Codes",
+                                            size=16,
+                                            weight=ft.FontWeight.BOLD
+                                        ),
+                                        prev_page_button,
+                                        page_label,
+                                        next_page_button,
+                                    ],
+                                    vertical_alignment=ft.CrossAxisAlignment.CENTER
                                 ),
                                 ft.Container(
                                     content=qr_output,
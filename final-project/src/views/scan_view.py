@@ -1,25 +1,26 @@
 # views/scan_view.py
 """View for QR code scanning and attendance recording with time slots."""
 
+import asyncio
 import flet as ft
 from datetime import datetime
-import time
-import threading
 from views.base_view import BaseView
-from config.constants import EMPLOYEES, CAMERA_WIDTH, CAMERA_HEIGHT, QR_SCAN_COOLDOWN, PRIMARY_COLOR, BLUE_50
+from config.constants import EMPLOYEES, CAMERA_WIDTH, CAMERA_HEIGHT, QR_SCAN_COOLDOWN, PREVIEW_ENABLED, PRIMARY_COLOR, BLUE_50
 from utils.qr_scanner import QRCameraScanner
+from utils.scan_executor import AsyncScanExecutor, BannerScheduler
 
 
 class ScanView(BaseView):
     """QR scanning screen with OpenCV camera support and time slot selection."""
     
-    def build(self, event_id: str):
+    async def build(self, event_id: str):
         """Build and return the scan view.
         
         Args:
             event_id: ID of the event to scan for
         """
-        event = self.db.get_event_by_id(event_id)
+        loop = asyncio.get_running_loop()
+        event = await self.adb.get_event_by_id(event_id)
         if not event:
             self.page.go("/home")
             return ft.View("/", [ft.Container()])
@@ -37,95 +38,80 @@ class ScanView(BaseView):
             # If date parsing fails, allow scanning (legacy data handling)
             pass
         
+        # Keep the roster in memory while scanning this event
+        try:
+            await self.adb.warm_roster_cache()
+        except Exception as e:
+            print(f"Error warming roster cache: {e}")
+        
         # Selected time slot state
         selected_time_slot = ["morning"]  # Default to morning
         
         scan_log = ft.ListView(spacing=5, padding=10)
-
-        def load_recent_scans(time_slot=None):
-            """Load recent scans for the selected time slot."""
+        
+        RECENT_SCANS_LIMIT = 15
+        
+        def create_scan_tile(record: dict):
+            """Build the log entry for one check-in."""
+            time_slot_val = record['time_slot']
+            
+            # Icon and color based on time slot
+            if time_slot_val == 'morning':
+                icon = ft.Icons.WB_SUNNY
+                icon_color = ft.Colors.ORANGE
+                slot_text = "☀️ Morning"
+                bg_color = ft.Colors.ORANGE_50
+            elif time_slot_val == 'afternoon':
+                icon = ft.Icons.NIGHTS_STAY
+                icon_color = ft.Colors.BLUE
+                slot_text = "🌙 Afternoon"
+                bg_color = ft.Colors.BLUE_50
+            else:
+                icon = ft.Icons.CHECK_CIRCLE
+                icon_color = ft.Colors.GREEN
+                slot_text = "✓"
+                bg_color = ft.Colors.GREEN_50
+            
+            return ft.Container(
+                content=ft.ListTile(
+                    leading=ft.Icon(icon, color=icon_color),
+                    title=ft.Text(record['name'], weight=ft.FontWeight.BOLD, size=14),
+                    subtitle=ft.Text(f"{slot_text} • {record['time']}", size=11),
+                    trailing=ft.Text(record['school_id'], size=11, color=ft.Colors.GREY_600),
+                    dense=True,
+                    content_padding=ft.padding.symmetric(horizontal=10, vertical=5)
+                ),
+                bgcolor=bg_color,
+                padding=ft.padding.symmetric(horizontal=5, vertical=3),
+                border_radius=8,
+                margin=ft.margin.only(bottom=5)
+            )
+        
+        # True while scan_log shows the empty-state placeholder
+        scan_log_empty = [False]
+        
+        def update_scan_log():
+            try:
+                if hasattr(scan_log, 'page') and scan_log.page:
+                    scan_log.update()
+            except:
+                pass  # Will update when added to page
+        
+        async def load_recent_scans(time_slot: str):
+            """Load the latest check-ins for the selected time slot."""
             scan_log.controls.clear()
+            scan_log_empty[0] = False
             
             try:
-                # Get attendance data by section which has the timeslot info
-                attendance_by_section = self.db.get_attendance_by_section(event_id)
-                
-                # Flatten and collect all scans
-                all_scans = []
-                for section_name, students in attendance_by_section.items():
-                    for student in students:
-                        # Add morning scan if present
-                        if student.get('morning_status') == 'Present' and student.get('morning_time'):
-                            all_scans.append({
-                                'school_id': student['school_id'],
-                                'name': student['name'],
-                                'time': student['morning_time'],
-                                'time_slot': 'morning',
-                                'status': 'Present'
-                            })
-                        # Add afternoon scan if present
-                        if student.get('afternoon_status') == 'Present' and student.get('afternoon_time'):
-                            all_scans.append({
-                                'school_id': student['school_id'],
-                                'name': student['name'],
-                                'time': student['afternoon_time'],
-                                'time_slot': 'afternoon',
-                                'status': 'Present'
-                            })
+                # Bounded query over this event's attendance rows only
+                records = await self.adb.get_recent_timeslot_scans(event_id, time_slot, RECENT_SCANS_LIMIT)
                 
-                # Sort by time (most recent first)
-                all_scans.sort(key=lambda x: x['time'], reverse=True)
-                
-                # Filter by selected time slot if specified
-                if time_slot:
-                    filtered_scans = [s for s in all_scans if s['time_slot'] == time_slot]
-                else:
-                    filtered_scans = all_scans
-                
-                # Limit to 15 most recent
-                filtered_scans = filtered_scans[:15]
-                
-                if filtered_scans:
-                    for record in filtered_scans:
-                        time_slot_val = record['time_slot']
-                        user_id = record['school_id']
-                        user_name = record['name']
-                        timestamp = record['time']
-                        
-                        # Icon and color based on time slot
-                        if time_slot_val == 'morning':
-                            icon = ft.Icons.WB_SUNNY
-                            icon_color = ft.Colors.ORANGE
-                            slot_text = "☀️ Morning"
-                            bg_color = ft.Colors.ORANGE_50
-                        elif time_slot_val == 'afternoon':
-                            icon = ft.Icons.NIGHTS_STAY
-                            icon_color = ft.Colors.BLUE
-                            slot_text = "🌙 Afternoon"
-                            bg_color = ft.Colors.BLUE_50
-                        else:
-                            icon = ft.Icons.CHECK_CIRCLE
-                            icon_color = ft.Colors.GREEN
-                            slot_text = "✓"
-                            bg_color = ft.Colors.GREEN_50
-                        
-                        scan_tile = ft.Container(
-                            content=ft.ListTile(
-                                leading=ft.Icon(icon, color=icon_color),
-                                title=ft.Text(user_name, weight=ft.FontWeight.BOLD, size=14),
-                                subtitle=ft.Text(f"{slot_text} • {timestamp}", size=11),
-                                trailing=ft.Text(user_id, size=11, color=ft.Colors.GREY_600),
-                                dense=True,
-                                content_padding=ft.padding.symmetric(horizontal=10, vertical=5)
-                            ),
-                            bgcolor=bg_color,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=3),
-                            border_radius=8,
-                            margin=ft.margin.only(bottom=5)
-                        )
-                        scan_log.controls.append(scan_tile)
+                if records:
+                    for record in records:
+                        scan_log.controls.append(create_scan_tile(record))
                 else:
                     # Show empty state
+                    scan_log_empty[0] = True
                     scan_log.controls.append(
                         ft.Container(
                             content=ft.Text(
@@ -145,14 +131,18 @@ class ScanView(BaseView):
                     ft.Text(f"Error loading scans: {str(e)}", color=ft.Colors.RED)
                 )
             
-            # Update the list view
-            try:
-                if hasattr(scan_log, 'page') and scan_log.page:
-                    scan_log.update()
-            except:
-                pass  # Will update when added to page
-
-        load_recent_scans(selected_time_slot[0])
+            update_scan_log()
+        
+        def add_recent_scan(record: dict):
+            """Prepend a check-in that was just recorded, without re-querying."""
+            if scan_log_empty[0]:
+                scan_log.controls.clear()
+                scan_log_empty[0] = False
+            scan_log.controls.insert(0, create_scan_tile(record))
+            del scan_log.controls[RECENT_SCANS_LIMIT:]
+            update_scan_log()
+        
+        await load_recent_scans(selected_time_slot[0])
         
         # Time slot selection buttons
         morning_btn = ft.ElevatedButton(
@@ -177,7 +167,7 @@ class ScanView(BaseView):
             height=50
         )
         
-        def select_morning(e):
+        async def select_morning(e):
             """Select morning time slot."""
             selected_time_slot[0] = "morning"
             morning_btn.style.bgcolor = ft.Colors.ORANGE_400
@@ -192,10 +182,10 @@ class ScanView(BaseView):
             camera_container.update()
             
             # Reload scans for morning
-            load_recent_scans("morning")
+            await load_recent_scans("morning")
             self.show_snackbar("Switched to Morning attendance", ft.Colors.ORANGE)
         
-        def select_afternoon(e):
+        async def select_afternoon(e):
             """Select afternoon time slot."""
             selected_time_slot[0] = "afternoon"
             morning_btn.style.bgcolor = ft.Colors.GREY_400
@@ -210,7 +200,7 @@ class ScanView(BaseView):
             camera_container.update()
             
             # Reload scans for afternoon
-            load_recent_scans("afternoon")
+            await load_recent_scans("afternoon")
             self.show_snackbar("Switched to Afternoon attendance", ft.Colors.BLUE)
         
         morning_btn.on_click = select_morning
@@ -225,7 +215,7 @@ class ScanView(BaseView):
         )
         
         # Get attendance stats
-        stats = self.db.get_attendance_summary(event_id)
+        stats = await self.adb.get_attendance_summary(event_id)
         morning_count = ft.Text(
             str(stats.get('morning', 0)),
             size=24,
@@ -364,159 +354,102 @@ class ScanView(BaseView):
             except Exception as e:
                 print(f"Error updating frame: {e}")
         
-        def process_scan(qr_data: str):
-            """Process QR code scan with new database structure."""
-            def _process_in_background():
-                try:
-                    # Double-check if event is still valid (not in past)
-                    current_event = self.db.get_event_by_id(event_id)
-                    if current_event:
-                        try:
-                            event_date = datetime.strptime(current_event['date'], '%Y-%m-%d').date()
-                            today = datetime.now().date()
-                            if event_date < today:
-                                scan_result_container.bgcolor = ft.Colors.RED_100
-                                scan_result_container.content.value = "❌ This event is in the past"
-                                scan_result_container.content.color = ft.Colors.RED_700
-                                scan_result_container.visible = True
-                                scan_result_container.update()
-                                
-                                self.show_snackbar("Cannot scan for past events", ft.Colors.RED)
-                                
-                                time.sleep(2)
-                                scan_result_container.visible = False
-                                scan_result_container.update()
-                                return
-                        except (ValueError, KeyError):
-                            pass
-                    
-                    # Parse QR data (format: school_id|name)
-                    parts = qr_data.split('|')
-                    if len(parts) < 1:
-                        # Show error feedback
-                        scan_result_container.bgcolor = ft.Colors.RED_100
-                        scan_result_container.content.value = "❌ Invalid QR format"
-                        scan_result_container.content.color = ft.Colors.RED_700
-                        scan_result_container.visible = True
-                        scan_result_container.update()
-                        
-                        # Hide after 2 seconds
-                        time.sleep(2)
-                        scan_result_container.visible = False
-                        scan_result_container.update()
-                        return
-                    
-                    school_id = parts[0].strip()
-                    current_time_slot = selected_time_slot[0]
-                    
-                    # Check if student exists
-                    student = self.db.get_student_by_id(school_id)
-                    if not student:
-                        # Show not found feedback
-                        scan_result_container.bgcolor = ft.Colors.RED_100
-                        scan_result_container.content.value = f"❌ Student {school_id} not found"
-                        scan_result_container.content.color = ft.Colors.RED_700
-                        scan_result_container.visible = True
-                        scan_result_container.update()
-                        
-                        time.sleep(2)
-                        scan_result_container.visible = False
-                        scan_result_container.update()
-                        return
-                    
-                    # Check if already checked in for this time slot
-                    already_checked = self.db.check_timeslot_attendance(event_id, school_id, current_time_slot)
-                    
-                    if already_checked:
-                        # Show already scanned feedback
-                        scan_result_container.bgcolor = ft.Colors.AMBER_100
-                        scan_result_container.content.value = f"⚠️ Already checked in for {current_time_slot.upper()}"
-                        scan_result_container.content.color = ft.Colors.AMBER_900
-                        scan_result_container.visible = True
-                        scan_result_container.update()
-                        
-                        # Keep visible longer for duplicate
-                        time.sleep(3)
-                        scan_result_container.visible = False
-                        scan_result_container.update()
-                        return
-                    
-                    # Record attendance
-                    success = self.db.record_timeslot_attendance(event_id, school_id, current_time_slot)
-                    
-                    # Record scan in activity log
-                    if success and self.app.current_user:
-                        student_name = student.get('name', school_id)
-                        self.db.record_scan(
-                            scanner_username=self.app.current_user,
-                            scanned_user_id=school_id,
-                            scanned_user_name=student_name,
-                            event_id=event_id
-                        )
-                    
-                    if success:
-                        # Show success feedback with animation
-                        student_name = student.get('name', school_id)
-                        scan_result_container.bgcolor = ft.Colors.GREEN_100
-                        scan_result_container.content.value = f"✅ {student_name}\n{current_time_slot.upper()} checked in"
-                        scan_result_container.content.color = ft.Colors.GREEN_700
-                        scan_result_container.visible = True
-                        scan_result_container.update()
-                        
-                        # Update stats display with a small delay for visual effect
-                        time.sleep(0.3)
-                        stats = self.db.get_attendance_summary(event_id)
-                        morning_count.value = str(stats.get('morning', 0))
-                        afternoon_count.value = str(stats.get('afternoon', 0))
-                        morning_count.update()
-                        afternoon_count.update()
-                        
-                        # Reload recent scans to show the new entry
-                        load_recent_scans(current_time_slot)
-                        
-                        # Show snackbar with updated info
-                        self.show_snackbar(
-                            f"✅ {student_name} checked in for {current_time_slot.upper()}!", 
-                            ft.Colors.GREEN
-                        )
-                        
-                        # Keep success message visible for 2.5 seconds
-                        time.sleep(2.5)
-                        scan_result_container.visible = False
-                        scan_result_container.update()
-                    else:
-                        # Show failure feedback
-                        scan_result_container.bgcolor = ft.Colors.RED_100
-                        scan_result_container.content.value = "❌ Failed to record attendance"
-                        scan_result_container.content.color = ft.Colors.RED_700
-                        scan_result_container.visible = True
-                        scan_result_container.update()
-                        
-                        self.show_snackbar("Failed to record attendance", ft.Colors.RED)
-                        
-                        time.sleep(2)
-                        scan_result_container.visible = False
-                        scan_result_container.update()
-                except Exception as e:
-                    print(f"Error processing scan: {e}")
-                    import traceback
-                    traceback.print_exc()
+        def hide_scan_result():
+            scan_result_container.visible = False
+            scan_result_container.update()
+        
+        banner = BannerScheduler(hide_scan_result, loop)
+        
+        def show_scan_result(bgcolor, text: str, color, duration: float):
+            """Show the scan result banner; a timer hides it after ``duration`` seconds."""
+            def apply():
+                scan_result_container.bgcolor = bgcolor
+                scan_result_container.content.value = text
+                scan_result_container.content.color = color
+                scan_result_container.visible = True
+                scan_result_container.update()
+            
+            banner.show(apply, duration)
+        
+        async def handle_scan(qr_data: str):
+            """Process one QR code scan with a single database call (awaited by the scan executor)."""
+            try:
+                current_time_slot = selected_time_slot[0]
+                
+                # Lookup, duplicate check, record and audit happen in one transaction
+                result = await self.adb.process_scan(
+                    event_id, qr_data, current_time_slot, self.app.current_user
+                )
+                status = result.get('status')
+                student = result.get('student') or {}
+                school_id = student.get('school_id') or qr_data.split('|')[0].strip()
+                
+                if status == 'past_event':
+                    self.show_snackbar("Cannot scan for past events", ft.Colors.RED)
+                    show_scan_result(ft.Colors.RED_100, "❌ This event is in the past", ft.Colors.RED_700, 2)
+                elif status == 'invalid_qr':
+                    show_scan_result(ft.Colors.RED_100, "❌ Invalid QR format", ft.Colors.RED_700, 2)
+                elif status == 'student_not_found':
+                    show_scan_result(ft.Colors.RED_100, f"❌ Student {school_id} not found", ft.Colors.RED_700, 2)
+                elif status == 'duplicate':
+                    # Keep visible longer for duplicate
+                    show_scan_result(
+                        ft.Colors.AMBER_100,
+                        f"⚠️ Already checked in for {current_time_slot.upper()}",
+                        ft.Colors.AMBER_900,
+                        3
+                    )
+                elif status == 'recorded':
+                    # Show success feedback, visible for 2.5 seconds
+                    student_name = student.get('name', school_id)
+                    show_scan_result(
+                        ft.Colors.GREEN_100,
+                        f"✅ {student_name}\n{current_time_slot.upper()} checked in",
+                        ft.Colors.GREEN_700,
+                        2.5
+                    )
                     
-                    # Show error feedback
-                    scan_result_container.bgcolor = ft.Colors.RED_100
-                    scan_result_container.content.value = f"❌ Error: {str(e)[:30]}"
-                    scan_result_container.content.color = ft.Colors.RED_700
-                    scan_result_container.visible = True
-                    scan_result_container.update()
+                    # Update stats display from the counters returned with the scan
+                    stats = result.get('summary', {})
+                    morning_count.value = str(stats.get('morning', 0))
+                    afternoon_count.value = str(stats.get('afternoon', 0))
+                    morning_count.update()
+                    afternoon_count.update()
                     
-                    self.show_snackbar(f"Error: {str(e)}", ft.Colors.RED)
+                    # Show the new entry at the top of the log
+                    add_recent_scan({
+                        'school_id': school_id,
+                        'name': student_name,
+                        'time': result.get('recorded_time') or datetime.now().strftime("%H:%M:%S"),
+                        'time_slot': current_time_slot
+                    })
                     
-                    time.sleep(2)
-                    scan_result_container.visible = False
-                    scan_result_container.update()
-            
-            # Run in background thread to avoid UI freeze
-            threading.Thread(target=_process_in_background, daemon=True).start()
+                    # Show snackbar with updated info
+                    self.show_snackbar(
+                        f"✅ {student_name} checked in for {current_time_slot.upper()}!", 
+                        ft.Colors.GREEN
+                    )
+                else:
+                    # event_not_found or error
+                    self.show_snackbar("Failed to record attendance", ft.Colors.RED)
+                    show_scan_result(ft.Colors.RED_100, "❌ Failed to record attendance", ft.Colors.RED_700, 2)
+            except Exception as e:
+                print(f"Error processing scan: {e}")
+                import traceback
+                traceback.print_exc()
+                
+                self.show_snackbar(f"Error: {str(e)}", ft.Colors.RED)
+                show_scan_result(ft.Colors.RED_100, f"❌ Error: {str(e)[:30]}", ft.Colors.RED_700, 2)
+        
+        # Scans are queued and awaited in order on the page's event loop
+        if getattr(self, 'scan_executor', None):
+            self.scan_executor.shutdown()
+        self.scan_executor = AsyncScanExecutor(handle_scan, loop)
+        
+        def process_scan(qr_data: str):
+            """Queue a scan for processing without blocking the UI or camera."""
+            if not self.scan_executor.submit(qr_data):
+                self.show_snackbar("Too many scans at once, please scan again", ft.Colors.ORANGE)
         
         def on_qr_detected(qr_data: str):
             """Callback when QR code is detected by camera."""
@@ -535,7 +468,7 @@ class ScanView(BaseView):
             qr_input.update()
             process_scan(user_id)
         
-        def toggle_camera(e):
+        async def toggle_camera(e):
             """Toggle camera on/off."""
             camera_active[0] = not camera_active[0]
             
@@ -568,17 +501,14 @@ class ScanView(BaseView):
                 self.app.qr_scanner.start()
                 
                 # Update status after delay
-                def update_status():
-                    time.sleep(0.5)
-                    if camera_active[0]:
-                        try:
-                            camera_status.value = "Camera: Scanning..."
-                            camera_status.color = ft.Colors.GREEN_700
-                            camera_status.update()
-                        except:
-                            pass
-                
-                threading.Thread(target=update_status, daemon=True).start()
+                await asyncio.sleep(0.5)
+                if camera_active[0]:
+                    try:
+                        camera_status.value = "Camera: Scanning..." if PREVIEW_ENABLED else "Camera: Scanning (preview off)"
+                        camera_status.color = ft.Colors.GREEN_700
+                        camera_status.update()
+                    except:
+                        pass
                 
             else:
                 # Stop camera
@@ -595,6 +525,8 @@ class ScanView(BaseView):
                 
                 if self.app.qr_scanner:
                     self.app.qr_scanner.stop()
+                    print(f"DEBUG: Scanner stats: {self.app.qr_scanner.get_stats()}")
+                print(f"DEBUG: Scan queue stats: {self.scan_executor.get_stats()}")
             
                 camera_btn.update()
                 camera_status.update()
@@ -0,0 +1,47 @@
+# tests/test_attendance_lookup.py
+"""A scan recorded through /api/scan is seen by the attendance lookup endpoints."""
+
+import importlib
+import os
+import sys
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pytest
+from database.db_manager import Database
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # api_server opens its database in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    api_server = importlib.import_module('api_server')
+    db = Database(str(tmp_path / 'test.db'))
+    db.create_student('S1', 'Ann Cruz', 'S1|Ann Cruz')
+    monkeypatch.setattr(api_server, 'db', db)
+    db.warm_roster_cache()
+    event_id = db.create_event('Assembly', date.today().isoformat(), 'Test event')
+    headers = {'X-API-Key': api_server.API_KEY}
+    return api_server.app.test_client(), headers, event_id
+
+
+def test_scan_then_lookup(client):
+    app, headers, event_id = client
+    
+    before = app.get(f'/api/attendance/{event_id}/S1', headers=headers).get_json()
+    assert before == {'checked_in': False, 'timestamp': None}
+    
+    scan = app.post('/api/scan', headers=headers, json={
+        'event_id': event_id, 'qr_payload': 'S1|Ann Cruz', 'time_slot': 'morning'
+    }).get_json()
+    assert scan['status'] == 'recorded'
+    
+    slot = app.get(f'/api/attendance/{event_id}/S1/morning', headers=headers).get_json()
+    assert slot['checked_in']
+    assert slot['timestamp'].endswith(scan['recorded_time'])
+    
+    any_slot = app.get(f'/api/attendance/{event_id}/S1', headers=headers).get_json()
+    assert any_slot == slot
+    
+    other_slot = app.get(f'/api/attendance/{event_id}/S1/lunch', headers=headers).get_json()
+    assert other_slot == {'checked_in': False, 'timestamp': None}
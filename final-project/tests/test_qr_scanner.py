@@ -0,0 +1,44 @@
+# tests/test_qr_scanner.py
+"""Recorded sources are decoded to the very last frame."""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+from utils.frame_sources import GeneratorSource
+from utils.qr_generator import make_qr_image
+from utils.qr_scanner import LatestFrameSlot, QRCameraScanner
+
+
+def make_frames(count: int, payload: str):
+    """``count`` plain grey frames, the last of which shows ``payload``."""
+    blank = np.full((480, 640, 3), 200, np.uint8)
+    code = np.array(make_qr_image(payload, 8).convert('L'))
+    last = blank.copy()
+    last[50:50 + code.shape[0], 50:50 + code.shape[1]] = code[:, :, None]
+    return [blank] * (count - 1) + [last]
+
+
+def test_slot_drains_after_close():
+    slot = LatestFrameSlot()
+    slot.put('frame')
+    slot.close()
+    
+    assert slot.get(0) == (1, 'frame')
+    assert slot.get(1, timeout=0) == (1, None)
+
+
+def test_code_in_last_frame_is_recorded():
+    detected = []
+    scanner = QRCameraScanner(detected.append, None, source=GeneratorSource(make_frames(30, 'S1|Ann Cruz')),
+                              fps=200, preview_enabled=False)
+    scanner.start()
+    deadline = time.monotonic() + 10
+    while scanner.is_running and time.monotonic() < deadline:
+        time.sleep(0.05)
+    
+    assert not scanner.is_running
+    assert detected == ['S1|Ann Cruz']
+    assert scanner.get_stats()['frames_dropped'] == 0